@@ -0,0 +1,84 @@
+from threading import Lock
+from typing import Iterable, NamedTuple, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from app import metrics
+from app.cache import TTLCache
+from app.config import settings
+from app.invalidation import channel
+
+
+class Access(NamedTuple):
+    is_owner: bool
+    can_view: bool
+    can_sign: bool
+
+    @property
+    def can_read(self) -> bool:
+        return self.is_owner or self.can_view
+
+
+NO_ACCESS = Access(False, False, False)
+
+# Keyed by (document_id, user_id). A missing document is cached as None so
+# repeated probes for it stay off the database too.
+acl_cache = TTLCache(maxsize=settings.ACL_CACHE_MAX_SIZE, ttl=settings.ACL_CACHE_TTL_SECONDS)
+metrics.register_cache("acl", acl_cache)
+
+MISSING = object()
+
+# Bumped by every invalidation this worker applies. A decision is stored only if none was applied since the
+# transaction that read it began; otherwise it may predate a grant or revoke that was just invalidated.
+GENERATION_KEY = "acl_generation"
+_generation = 0
+_lock = Lock()
+
+
+@event.listens_for(OrmSession, "after_begin")
+def _note_generation(session, transaction, connection):
+    session.info[GENERATION_KEY] = _generation
+
+
+def lookup(document_id: int, user_id: int):
+    """Cached decision for the pair, or `MISSING` when it has to be computed."""
+    entry = acl_cache.get((document_id, user_id))
+    return MISSING if entry is None else entry[0]
+
+
+def store(document_id: int, user_id: int, access: Optional[Access], generation: Optional[int]) -> None:
+    """Cache a decision read in a transaction that began at `generation`, unless it is already outdated."""
+    with _lock:
+        if generation != _generation:
+            return
+        acl_cache.set((document_id, user_id), (access,))
+
+
+def invalidate(document_id: int, user_id: Optional[int] = None) -> None:
+    channel.publish({"type": "acl", "document_id": document_id, "user_id": user_id})
+
+
+def invalidate_many(document_ids: Iterable[int]) -> None:
+    """Invalidate every decision about `document_ids` with one message and one pass over the cache."""
+    document_ids = list(document_ids)
+    if document_ids:
+        channel.publish({"type": "acl", "document_ids": document_ids})
+
+
+def _apply(message: dict) -> None:
+    global _generation
+    if message.get("type") != "acl":
+        return
+    with _lock:
+        _generation += 1
+        if "document_ids" in message:
+            document_ids = set(message["document_ids"])
+            acl_cache.pop_where(lambda key: key[0] in document_ids)
+            return
+        document_id, user_id = message["document_id"], message.get("user_id")
+        if user_id is None:
+            acl_cache.pop_where(lambda key: key[0] == document_id)
+        else:
+            acl_cache.pop((document_id, user_id))
+
+
+channel.subscribe(_apply)
@@ -0,0 +1,72 @@
+from datetime import datetime
+from pathlib import PurePath
+from typing import Iterable, Iterator, List, Set
+import io
+import zipfile
+from app import models
+from app.storage import StorageBackend
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only, unseekable sink; whatever zipfile writes is collected until drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _unique_name(filename: str, used: Set[str]) -> str:
+    name = PurePath(filename).name or "document"
+    candidate, counter = name, 1
+    while candidate in used:
+        counter += 1
+        path = PurePath(name)
+        candidate = f"{path.stem} ({counter}){path.suffix}"
+    used.add(candidate)
+    return candidate
+
+
+def _zip_timestamp(value: datetime):
+    # The ZIP format cannot represent dates before 1980.
+    return max(value, datetime(1980, 1, 1)).timetuple()[:6]
+
+
+def iter_zip(documents: Iterable[models.Document], backend: StorageBackend, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """Yield a ZIP archive of `documents` as it is built.
+
+    Nothing is buffered beyond one chunk of input: zipfile falls back to data
+    descriptors on an unseekable sink, so sizes and CRCs follow each entry.
+    """
+    sink = _StreamSink()
+    used: Set[str] = set()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for doc in documents:
+            info = zipfile.ZipInfo(_unique_name(doc.original_filename, used), date_time=_zip_timestamp(doc.upload_date))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with archive.open(info, mode="w", force_zip64=True) as entry:
+                encoding = doc.blob.encoding if doc.blob else None
+                for chunk in backend.iter_original(doc.filename, encoding, chunk_size):
+                    entry.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
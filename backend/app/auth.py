@@ -1,19 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Annotated
-from fastapi import Depends, HTTPException, status
+from threading import Lock
+from typing import Callable, Optional, Annotated, Tuple
+import asyncio
+import time
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlmodel import Session
+from app import metrics
+from app.cache import TTLCache
 from app.config import settings
-from app.database import engine
+from app.dependencies import DB, get_db
+from app.invalidation import channel
 from app.models import User as UserModel
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min and max to the configured cost makes passlib flag hashes made at any other cost for an update.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
 
+user_cache = TTLCache(maxsize=settings.USER_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+metrics.register_cache("user", user_cache)
+
+
+class AuthStats:
+    """Counts authenticated requests and the DB lookups they needed."""
+
+    def __init__(self):
+        self.requests = 0
+        self.db_lookups = 0
+
+
+auth_stats = AuthStats()
+
+metrics.registry.callback(
+    "auth_requests_total", "Requests authenticated with a bearer token.",
+    lambda: [((), auth_stats.requests)], kind="counter")
+metrics.registry.callback(
+    "auth_user_db_lookups_total", "User lookups that missed the user cache and went to the database.",
+    lambda: [((), auth_stats.db_lookups)], kind="counter")
+
+
+def invalidate_user_cache(email: Optional[str] = None) -> None:
+    channel.publish({"type": "user", "email": email})
+
+def _apply_invalidation(message: dict) -> None:
+    if message.get("type") != "user":
+        return
+    if message.get("email") is None:
+        user_cache.clear()
+    else:
+        user_cache.pop(message["email"])
+
+channel.subscribe(_apply_invalidation)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -21,6 +69,90 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated thread pool, away from the event loop and the DB threadpool.
+
+    At most `max_pending` operations may be queued or running; beyond that callers get a 503
+    instead of piling up behind the pool.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = Lock()
+        self.max_pending = max_pending
+        self.pending = 0
+        self.operations = 0
+        self.seconds = 0.0
+        self.rejected = 0
+        self._dummy_hash: Optional[str] = None
+
+    def _timed(self, fn: Callable, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.operations += 1
+                self.seconds += time.perf_counter() - start
+
+    async def _run(self, fn: Callable, *args):
+        # `pending` is only touched from the event loop thread.
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent password checks, try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._timed, fn, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: Optional[str]) -> Tuple[bool, Optional[str]]:
+        """Returns whether `password` matches and, if the hash needs upgrading, its replacement."""
+        if hashed_password is None:
+            # Spend the same time on unknown accounts so response times do not reveal which emails exist.
+            if self._dummy_hash is None:
+                self._dummy_hash = await self.hash("dummy-password")
+            await self._run(pwd_context.verify, password, self._dummy_hash)
+            return False, None
+        return await self._run(pwd_context.verify_and_update, password, hashed_password)
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
+metrics.registry.callback(
+    "password_hash_operations_total", "bcrypt hash and verify calls completed.",
+    lambda: [((), password_hasher.operations)], kind="counter")
+metrics.registry.callback(
+    "password_hash_seconds_total", "Time spent inside bcrypt, excluding queueing.",
+    lambda: [((), password_hasher.seconds)], kind="counter")
+metrics.registry.callback(
+    "password_hash_pending", "bcrypt calls queued or running.",
+    lambda: [((), password_hasher.pending)])
+metrics.registry.callback(
+    "password_hash_rejected_total", "bcrypt calls refused because the queue was full.",
+    lambda: [((), password_hasher.rejected)], kind="counter")
+
+
+async def authenticate_user(db: DB, email: str, password: str) -> Optional[UserModel]:
+    from .crud import get_user_by_email, update_user
+
+    user = await db.run(get_user_by_email, email=email)
+    valid, new_hash = await password_hasher.verify(password, user.hashed_password if user else None)
+    if not valid:
+        return None
+    if new_hash is not None:
+        # The configured cost changed since this hash was made; upgrade it while we have the password.
+        user = await db.run(update_user, db_user=user, hashed_password=new_hash)
+    return user
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -31,7 +163,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], session: Session = Depends(lambda: next(get_session_local()))) -> UserModel:
+async def get_current_user(
+    request: Request,
+    token: Annotated[str, Depends(oauth2_scheme)],
+    db: DB = Depends(get_db)
+) -> UserModel:
+    principal = getattr(request.state, "principal", None)
+    if principal is not None:
+        return principal
+
     from .crud import get_user_by_email
 
     credentials_exception = HTTPException(
@@ -47,16 +187,26 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)], sessio
     except JWTError:
         raise credentials_exception
 
-    user = get_user_by_email(session, email=email)
+    auth_stats.requests += 1
+    stats = metrics.current_request.get()
+    if stats is not None:
+        stats.auth_db_lookups = 0
+    user = user_cache.get(email)
     if user is None:
-        raise credentials_exception
+        db_user = await db.run(get_user_by_email, email=email)
+        auth_stats.db_lookups += 1
+        if stats is not None:
+            stats.auth_db_lookups += 1
+        if db_user is None:
+            raise credentials_exception
+        # Cache a detached copy so it outlives the request session.
+        user = UserModel(**db_user.model_dump())
+        user_cache.set(email, user)
+
+    request.state.principal = user
     return user
 
 async def get_current_active_user(current_user: Annotated[UserModel, Depends(get_current_user)]) -> UserModel:
     if not current_user.is_active:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Inactive user")
     return current_user
-
-def get_session_local():
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
@@ -0,0 +1,72 @@
+import argparse
+import sys
+from pathlib import Path
+from app import database, importer, storage
+from app.config import settings
+
+
+def migrate_storage(args: argparse.Namespace) -> None:
+    print(f"Moving flat files from {settings.UPLOAD_DIR} into the '{settings.STORAGE_BACKEND}' backend...")
+    moved = storage.migrate_flat_layout()
+    print(f"Moved {moved} files.")
+
+
+def import_documents(args: argparse.Namespace) -> None:
+    source = Path(args.source)
+    database.run_migrations()
+    if source.is_dir():
+        if not args.owner:
+            sys.exit("--owner is required when importing a directory")
+        files = importer.scan_directory(source, args.owner)
+    else:
+        files = importer.read_manifest(source, args.owner)
+    print(f"Importing from {source} with {args.workers} workers, {args.batch_size} files per transaction...")
+    try:
+        stats = importer.run_import(files, workers=args.workers, batch_size=args.batch_size, use_mtime=args.use_mtime)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f"Done: {stats.summary()}")
+
+
+def storage_stats(args: argparse.Namespace) -> None:
+    from sqlmodel import Session
+    from app import crud
+    with Session(database.engine) as session:
+        rows = crud.get_storage_usage(session)
+    total_original = total_stored = 0
+    print(f"{'encoding':<10} {'blobs':>8} {'original MB':>12} {'stored MB':>10} {'ratio':>6}")
+    for encoding, blobs, original, stored in rows:
+        original, stored = original or 0, stored or 0
+        total_original += original
+        total_stored += stored
+        ratio = original / stored if stored else 1.0
+        print(f"{encoding or 'raw':<10} {blobs:>8} {original / 1e6:>12.1f} {stored / 1e6:>10.1f} {ratio:>5.1f}x")
+    saved = total_original - total_stored
+    print(f"Saved {saved / 1e6:.1f} MB of {total_original / 1e6:.1f} MB "
+          f"({saved / total_original if total_original else 0:.0%}).")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = commands.add_parser("migrate-storage", help="move files from the flat UPLOAD_DIR layout into the configured storage backend")
+    migrate.set_defaults(func=migrate_storage)
+
+    bulk = commands.add_parser("import-documents", help="import a directory tree or CSV manifest of existing files; re-run to resume")
+    bulk.add_argument("source", help="directory to walk, or CSV manifest with path,title,description,owner_email columns")
+    bulk.add_argument("--owner", help="email of the owning user (default for manifest rows without owner_email)")
+    bulk.add_argument("--workers", type=int, default=8, help="files copied into storage in parallel")
+    bulk.add_argument("--batch-size", type=int, default=500, help="documents inserted per transaction")
+    bulk.add_argument("--use-mtime", action="store_true", help="use file modification times as upload dates")
+    bulk.set_defaults(func=import_documents)
+
+    stats = commands.add_parser("storage-stats", help="report original and stored bytes per blob encoding")
+    stats.set_defaults(func=storage_stats)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compression of stored blobs, applied only to content types that benefit from it.
+
+zstd needs the optional `zstandard` package, imported when compression is first used.
+"""
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+from app.config import settings
+
+ZSTD = "zstd"
+# Suffix of the storage key holding each encoding of a blob.
+SUFFIXES = {ZSTD: ".zst"}
+
+_COMPRESSIBLE = {media_type.strip() for media_type in settings.COMPRESSIBLE_CONTENT_TYPES.split(",") if media_type.strip()}
+
+
+def choose_encoding(content_type: Optional[str], size: int) -> Optional[str]:
+    """The encoding worth trying for an upload, or None to store it as is."""
+    if settings.STORAGE_COMPRESSION != ZSTD or size < settings.COMPRESSION_MIN_SIZE:
+        return None
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type.startswith("text/") or media_type.endswith(("+xml", "+json")) or media_type in _COMPRESSIBLE:
+        return ZSTD
+    return None
+
+
+def compress_file(source: Path, target: Path) -> int:
+    """Write `source` compressed to `target`; returns the compressed size."""
+    import zstandard
+    compressor = zstandard.ZstdCompressor(level=settings.COMPRESSION_LEVEL, write_content_size=True)
+    with source.open("rb") as reader, target.open("wb") as writer:
+        compressor.copy_stream(reader, writer, read_size=settings.UPLOAD_CHUNK_SIZE, write_size=settings.UPLOAD_CHUNK_SIZE)
+    return target.stat().st_size
+
+
+def iter_decompressed(stream: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    """Decompress `stream` without holding more than one output chunk in memory."""
+    import zstandard
+    yield from zstandard.ZstdDecompressor().read_to_iter(stream, read_size=chunk_size, write_size=chunk_size)
+
+
+def iter_decompressed_range(stream: BinaryIO, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+    """Bytes `start`..`end` (inclusive) of the decompressed content; the skipped prefix is still decoded."""
+    position = 0
+    for chunk in iter_decompressed(stream, chunk_size):
+        chunk_end = position + len(chunk)
+        if chunk_end > start:
+            yield chunk[max(start - position, 0):end - position + 1]
+        position = chunk_end
+        if position > end:
+            return
@@ -0,0 +1,131 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
+import hashlib
+from fastapi import Request, Response, status
+
+
+def make_etag(value: str) -> str:
+    return f'"{value}"'
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _truncate(value: datetime) -> datetime:
+    # HTTP dates only carry whole seconds.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since (RFC 9110 section 13.2.2)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        since = _parse_http_date(if_modified_since)
+        return since is not None and _truncate(last_modified) <= since
+    return False
+
+
+def if_range_allows(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """True when a Range header may be honoured; a stale If-Range means the full body is sent instead."""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    since = _parse_http_date(if_range)
+    return since is not None and last_modified is not None and _truncate(last_modified) == since
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range `bytes=` header into an inclusive (start, end).
+
+    Returns None when the whole representation should be sent (no header, other
+    units, or several ranges), and raises RangeNotSatisfiable for ranges outside
+    the content.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            start, end = max(size - suffix, 0), size - 1
+        else:
+            start = int(first)
+            end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+
+def accepts_encoding(request: Request, coding: str) -> bool:
+    """Whether Accept-Encoding lists `coding` (or `*`) with a non-zero quality."""
+    accepted = {}
+    for item in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted.get(coding, accepted.get("*", 0.0)) > 0
+
+
+def conditional_json(
+    request: Request,
+    body: bytes,
+    last_modified: Optional[datetime] = None,
+    status_code: int = status.HTTP_200_OK,
+    trust_last_modified: bool = True,
+) -> Response:
+    """Answer with the serialized `body`, or 304 when the client already holds this exact body.
+
+    Pass `trust_last_modified=False` when the body can change without `last_modified` moving (a list
+    that loses an entry): the header is still sent, but only If-None-Match can then produce a 304.
+    """
+    etag = make_etag(hashlib.sha256(body).hexdigest()[:32])
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    # Another change within the same second would carry the same HTTP date, so only a date from an earlier
+    # second is handed out; any later change then lands in a later second than the one the client holds.
+    if last_modified is not None and _truncate(last_modified) < _truncate(datetime.now(timezone.utc)):
+        headers["Last-Modified"] = http_date(last_modified)
+    if is_not_modified(request, etag, last_modified if trust_last_modified else None):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
@@ -1,5 +1,6 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
-from typing import ClassVar
+from typing import ClassVar, Optional
 from pathlib import Path
 import os
 
@@ -13,8 +14,91 @@ class Settings(BaseSettings):
 
     UPLOAD_DIR_NAME: str = os.getenv("UPLOAD_DIR_NAME", "uploads")
     UPLOAD_DIR: Path = BASE_DIR / UPLOAD_DIR_NAME
+    # Defaults to UPLOAD_DIR/.staging; it must be on UPLOAD_DIR's filesystem so staged files can be moved in.
+    STAGING_DIR: Optional[Path] = None
+    MAX_UPLOAD_SIZE: int = 100 * 1024 * 1024
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
+    MAX_ARCHIVE_DOCUMENTS: int = 500
+    MAX_BATCH_DELETE_DOCUMENTS: int = 1000
+    MAX_BATCH_SHARE_USERS: int = 500
+
+    STORAGE_BACKEND: str = "local"
+    STORAGE_SHARD_DEPTH: int = 2
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: Optional[str] = None
+    S3_REGION: Optional[str] = None
+    # "zstd" stores compressible uploads compressed (needs the zstandard package); empty keeps raw bytes.
+    STORAGE_COMPRESSION: str = ""
+    COMPRESSION_LEVEL: int = 3
+    COMPRESSION_MIN_SIZE: int = 1024
+    # Keep the raw bytes unless compressing saves at least this fraction.
+    COMPRESSION_MIN_SAVINGS: float = 0.1
+    # text/*, */*+xml and */*+json are always candidates; these are added to them.
+    COMPRESSIBLE_CONTENT_TYPES: str = (
+        "application/json,application/xml,application/javascript,application/x-ndjson,application/sql,"
+        "application/rtf,application/msword,application/vnd.ms-excel,application/vnd.ms-powerpoint,"
+        "application/x-tar,application/postscript,image/bmp,image/svg+xml,image/tiff"
+    )
 
     DATABASE_URL: str = os.getenv("DATABASE_URL", f"sqlite:///./{os.getenv('DB_NAME', 'document_flow.db')}")
+    DB_ASYNC: bool = False
+    # Comma-separated URLs of read replicas; read-only routes use them when set.
+    DATABASE_REPLICA_URLS: str = ""
+    # After a user's own write, their reads stay on the primary this long to cover replication lag.
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    # Apply the settings below on every new connection; false leaves the driver defaults.
+    DB_TUNING: bool = True
+    # SQLite: WAL lets readers run alongside the single writer; NORMAL only fsyncs at checkpoints in WAL mode.
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    # Server databases (Postgres): per-process connection pool and statement limit (0 disables it).
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
+
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    USER_CACHE_MAX_SIZE: int = 1024
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    ACL_CACHE_MAX_SIZE: int = 10000
+    ACL_CACHE_TTL_SECONDS: float = 300.0
+    # Set to a redis:// URL so cache invalidations reach every worker process.
+    INVALIDATION_REDIS_URL: Optional[str] = None
+
+    METRICS_ENABLED: bool = True
+
+    LOG_LEVEL: str = "INFO"
+    # "text" or "json" (one object per line, for log shippers).
+    LOG_FORMAT: str = "text"
+    SQL_ECHO: bool = False
+    # Statements slower than this are logged with their fingerprint; 0 disables the log.
+    SLOW_QUERY_SECONDS: float = 0.5
+    SLOW_QUERY_LOG_MAX_CHARS: int = 2000
+    VALIDATION_LOG_MAX_CHARS: int = 2000
+
+    PROCESSING_ENABLED: bool = True
+    PROCESSING_WORKERS: int = 2
+    PROCESSING_MAX_ATTEMPTS: int = 3
+    PROCESSING_RETRY_BASE_SECONDS: float = 30.0
+    PROCESSING_POLL_SECONDS: float = 5.0
+    PROCESSING_TIMEOUT_SECONDS: float = 300.0
+    MAX_EXTRACTED_TEXT_CHARS: int = 1_000_000
+    PREVIEW_SIZE: int = 512
+
+    @model_validator(mode="after")
+    def _derive_staging_dir(self) -> "Settings":
+        if self.STAGING_DIR is None:
+            self.STAGING_DIR = self.UPLOAD_DIR / ".staging"
+        return self
 
     class Config:
         env_file = ".env"
@@ -1,17 +1,22 @@
-from typing import List, Optional
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import and_, delete, exists, func, or_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlmodel import Session, select
 from fastapi import HTTPException, status
-from pathlib import Path
-from app import models
-from .auth import get_password_hash, verify_password
-from app.config import settings
-import os
+from app import acl, models, processing, reclamation, search, storage
+from .auth import invalidate_user_cache
 from app import schemas
+import base64
+import logging
 
-UPLOAD_DIR = settings.UPLOAD_DIR
+logger = logging.getLogger(__name__)
 
-def create_user(session: Session, user_in: models.UserCreate) -> models.User:
-    hashed_password = get_password_hash(user_in.password)
+def create_user(session: Session, user_in: models.UserCreate, hashed_password: str) -> models.User:
     db_user = models.User(
         email=user_in.email,
         full_name=user_in.full_name,
@@ -21,90 +26,375 @@ def create_user(session: Session, user_in: models.UserCreate) -> models.User:
     session.add(db_user)
     session.commit()
     session.refresh(db_user)
+    invalidate_user_cache(db_user.email)
     return db_user
 
+def update_user(session: Session, db_user: models.User, **changes) -> models.User:
+    old_email = db_user.email
+    for key, value in changes.items():
+        setattr(db_user, key, value)
+    session.add(db_user)
+    session.commit()
+    session.refresh(db_user)
+    invalidate_user_cache(old_email)
+    invalidate_user_cache(db_user.email)
+    return db_user
+
+def deactivate_user(session: Session, user_id: int) -> Optional[models.User]:
+    db_user = session.get(models.User, user_id)
+    if db_user is None:
+        return None
+    return update_user(session, db_user, is_active=False)
+
 def get_user_by_email(session: Session, email: str) -> Optional[models.User]:
     return session.exec(select(models.User).where(models.User.email == email)).first()
 
 def get_user(session: Session, user_id: int) -> Optional[models.User]:
     return session.get(models.User, user_id)
 
-def authenticate_user(session: Session, email: str, password: str) -> Optional[models.User]:
-    user = get_user_by_email(session, email=email)
-    if not user:
-        return None
-    if not verify_password(password, user.hashed_password):
-        return None
-    return user
+def _insert(session: Session, table):
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+def _link_blob(session: Session, blob: storage.StoredBlob) -> None:
+    statement = _insert(session, models.Blob).values(
+        sha256=blob.key, size=blob.size, ref_count=1, encoding=blob.encoding, stored_size=blob.stored_size
+    )
+    # The encoding is what the caller just found or wrote in storage; a tombstone's may be stale.
+    statement = statement.on_conflict_do_update(
+        index_elements=["sha256"],
+        set_={
+            "ref_count": models.Blob.ref_count + 1,
+            "encoding": statement.excluded.encoding,
+            "stored_size": statement.excluded.stored_size,
+        }
+    )
+    session.execute(statement)
+
+def _tombstone_blobs(session: Session, keys: List[str]) -> None:
+    """Make sure each key has a blob row, so the reclaimer can claim it; new rows have no references."""
+    if keys:
+        session.execute(
+            _insert(session, models.Blob)
+            .values([{"sha256": key, "size": 0, "ref_count": 0} for key in set(keys)])
+            .on_conflict_do_nothing(index_elements=["sha256"])
+        )
+
+def _unlink_blobs(session: Session, references: Counter) -> List[str]:
+    """Drop `references[key]` references to each key; returns the keys whose stored file is no longer needed.
+
+    Emptied rows are kept with ref_count 0 as tombstones for the reclaimer, which deletes them together
+    with the file (see reclamation).
+    """
+    existing = set(session.exec(select(models.Blob.sha256).where(models.Blob.sha256.in_(references))).all())
+    keys_by_count = defaultdict(list)
+    for key in existing:
+        keys_by_count[references[key]].append(key)
+    for count, keys in keys_by_count.items():
+        session.execute(
+            update(models.Blob)
+            .where(models.Blob.sha256.in_(keys))
+            .values(ref_count=models.Blob.ref_count - count)
+        )
+    emptied = session.exec(
+        select(models.Blob.sha256).where(models.Blob.sha256.in_(existing), models.Blob.ref_count <= 0)
+    ).all()
+    # Files stored before the blob table existed are private to their document.
+    legacy = [key for key in references if key not in existing]
+    _tombstone_blobs(session, legacy)
+    return legacy + list(emptied)
+
+def release_blobs(session: Session, keys: List[str]) -> None:
+    """Give up files stored for a transaction that failed; the reclaimer removes those nothing references by then."""
+    session.rollback()
+    _tombstone_blobs(session, keys)
+    reclamation.reclaimer.defer(session, keys)
+    session.commit()
+
+def update_blob_storage(session: Session, blob: storage.StoredBlob) -> None:
+    """Record how `blob` is stored after it had to be stored again."""
+    session.execute(
+        update(models.Blob)
+        .where(models.Blob.sha256 == blob.key)
+        .values(encoding=blob.encoding, stored_size=blob.stored_size)
+    )
+    session.commit()
+
+def _touch_document(session: Session, document_id: int) -> None:
+    """Bump updated_at for a change made through another table (shares, signatures)."""
+    session.execute(
+        update(models.Document).where(models.Document.id == document_id).values(updated_at=datetime.utcnow())
+    )
+
+def _new_version(doc: models.Document) -> models.DocumentVersion:
+    """A version row recording the file `doc` currently points at."""
+    return models.DocumentVersion(
+        document_id=doc.id,
+        version=doc.version,
+        filename=doc.filename,
+        original_filename=doc.original_filename,
+        content_type=doc.content_type,
+        sha256=doc.sha256,
+        size=doc.size,
+    )
 
-def create_document(session: Session, doc_in: models.DocumentCreate, owner_id: int, file_path: Path) -> models.Document:
+def create_document(session: Session, doc_in: models.DocumentCreate, owner_id: int, blob: storage.StoredBlob) -> models.Document:
+    """Insert a document for a file the caller has already put in storage."""
     db_doc = models.Document(
-        **doc_in.model_dump(exclude={'filename'}),
+        **doc_in.model_dump(exclude={'filename', 'sha256', 'size'}),
         owner_id=owner_id,
-        filename=file_path.name
+        filename=blob.key,
+        sha256=blob.key,
+        size=blob.size
     )
+    _link_blob(session, blob)
     session.add(db_doc)
+    session.flush()
+    session.add(_new_version(db_doc))
+    processing.enqueue(session, db_doc)
+    search.index_document(session, db_doc, content="")
     session.commit()
     session.refresh(db_doc)
+    session.refresh(db_doc, attribute_names=["owner"])
     return db_doc
 
+def get_storage_usage(session: Session) -> List[Tuple[Optional[str], int, int, int]]:
+    """(encoding, blobs, original bytes, stored bytes) per blob encoding."""
+    stored_size = func.coalesce(models.Blob.stored_size, models.Blob.size)
+    return session.exec(
+        select(models.Blob.encoding, func.count(), func.sum(models.Blob.size), func.sum(stored_size))
+        .where(models.Blob.ref_count > 0)
+        .group_by(models.Blob.encoding)
+        .order_by(models.Blob.encoding)
+    ).all()
+
+def get_imported_sources(session: Session, sources: List[str]) -> Set[str]:
+    return set(session.exec(select(models.ImportedFile.source).where(models.ImportedFile.source.in_(sources))).all())
+
+def import_documents(
+    session: Session,
+    entries: List[Tuple[str, int, models.DocumentCreate]],
+    created_keys: List[str],
+    stored_as: Optional[Dict[str, Tuple[Optional[str], int]]] = None,
+) -> List[int]:
+    """Insert (source, owner_id, document) entries whose files are already stored, in one transaction.
+
+    Each document gets its owner permission, a processing job and an ImportedFile record. Sources
+    imported earlier are skipped. `created_keys` are the files this batch added to storage; they are
+    released again if the transaction fails. `stored_as` maps keys to their (encoding, stored size)
+    when not stored raw. Returns the new document ids.
+    """
+    stored_as = stored_as or {}
+    done = get_imported_sources(session, [source for source, _, _ in entries])
+    fresh = []
+    for source, owner_id, doc_in in entries:
+        if source not in done:
+            done.add(source)
+            fresh.append((source, owner_id, doc_in))
+    if not fresh:
+        return []
+
+    references = Counter(doc_in.filename for _, _, doc_in in fresh)
+    sizes = {doc_in.filename: doc_in.size for _, _, doc_in in fresh}
+    statement = _insert(session, models.Blob).values([
+        {
+            "sha256": key,
+            "size": sizes[key],
+            "ref_count": count,
+            "encoding": stored_as.get(key, (None, sizes[key]))[0],
+            "stored_size": stored_as.get(key, (None, sizes[key]))[1],
+        }
+        for key, count in references.items()
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=["sha256"],
+        set_={
+            "ref_count": models.Blob.ref_count + statement.excluded.ref_count,
+            "encoding": statement.excluded.encoding,
+            "stored_size": statement.excluded.stored_size,
+        }
+    )
+    session.execute(statement)
+
+    documents = [models.Document(**doc_in.model_dump(), owner_id=owner_id) for _, owner_id, doc_in in fresh]
+    session.add_all(documents)
+    session.flush()
+    granted_at = datetime.utcnow()
+    for (source, owner_id, _), doc in zip(fresh, documents):
+        session.add(models.DocumentPermission(
+            document_id=doc.id, user_id=owner_id, can_view=True, can_sign=True, granted_at=granted_at
+        ))
+        session.add(_new_version(doc))
+        session.add(models.ImportedFile(source=source, document_id=doc.id, imported_at=granted_at))
+        processing.enqueue(session, doc)
+        search.index_document(session, doc, content="")
+    try:
+        session.commit()
+    except Exception:
+        release_blobs(session, created_keys)
+        raise
+    return [doc.id for doc in documents]
+
+def get_access(session: Session, document_id: int, user_id: int) -> Optional[acl.Access]:
+    """What `user_id` may do with the document, or None if it does not exist. Served from the ACL cache when possible."""
+    cached = acl.lookup(document_id, user_id)
+    if cached is not acl.MISSING:
+        return cached
+    row = session.exec(
+        select(models.Document.owner_id, models.DocumentPermission.can_view, models.DocumentPermission.can_sign)
+        .outerjoin(models.DocumentPermission, and_(
+            models.DocumentPermission.document_id == models.Document.id,
+            models.DocumentPermission.user_id == user_id
+        ))
+        .where(models.Document.id == document_id)
+    ).first()
+    access = None
+    if row is not None:
+        access = acl.Access(is_owner=row.owner_id == user_id, can_view=bool(row.can_view), can_sign=bool(row.can_sign))
+    # A lagging replica can still show a grant the primary has revoked; only primary reads go into the cache.
+    if not session.info.get("replica"):
+        acl.store(document_id, user_id, access, session.info.get(acl.GENERATION_KEY))
+    return access
+
 def get_document(session: Session, document_id: int, user_id: int) -> Optional[models.Document]:
-    statement = select(models.Document).where(models.Document.id == document_id)
-    doc = session.exec(statement).first()
-    if not doc:
+    access = get_access(session, document_id, user_id)
+    if access is None or not access.can_read:
         return None
-    if doc.owner_id == user_id:
-        return doc
-    permission_statement = select(models.DocumentPermission).where(
-        models.DocumentPermission.document_id == document_id,
-        models.DocumentPermission.user_id == user_id,
-        models.DocumentPermission.can_view == True
-    )
-    permission = session.exec(permission_statement).first()
-    if permission:
-        return doc
-    return None
+    return session.get(models.Document, document_id)
 
 def get_document_for_download(session: Session, document_id: int, user_id: int) -> Optional[models.Document]:
-    return get_document(session, document_id, user_id)
+    """Like get_document, with the blob row loaded to tell how the file is stored."""
+    access = get_access(session, document_id, user_id)
+    if access is None or not access.can_read:
+        return None
+    return session.get(models.Document, document_id, options=[joinedload(models.Document.blob)])
+
+def get_documents_by_ids(session: Session, document_ids: List[int], user_id: int) -> List[models.Document]:
+    """The subset of `document_ids` the user may view, checked in a single query."""
+    viewable, _ = _viewable_by(user_id)
+    statement = (
+        select(models.Document)
+        .where(models.Document.id.in_(document_ids), viewable)
+        .options(joinedload(models.Document.blob))
+    )
+    documents = {doc.id: doc for doc in session.exec(statement).all()}
+    return [documents[doc_id] for doc_id in dict.fromkeys(document_ids) if doc_id in documents]
 
-def get_documents_for_user(session: Session, user_id: int) -> List[models.Document]:
-    owned_docs_statement = select(models.Document).where(models.Document.owner_id == user_id)
-    owned_docs = session.exec(owned_docs_statement).all()
-    shared_docs_permissions_statement = select(models.DocumentPermission).where(
+def encode_cursor(doc: models.Document) -> str:
+    raw = f"{doc.upload_date.isoformat()}|{doc.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        upload_date, doc_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(upload_date), int(doc_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+def _viewable_by(user_id: int):
+    shared = exists().where(
+        models.DocumentPermission.document_id == models.Document.id,
         models.DocumentPermission.user_id == user_id,
         models.DocumentPermission.can_view == True
     )
-    shared_permissions = session.exec(shared_docs_permissions_statement).all()
-    shared_doc_ids = [perm.document_id for perm in shared_permissions]
-    shared_docs = []
-    if shared_doc_ids:
-        shared_docs_statement = select(models.Document).where(models.Document.id.in_(shared_doc_ids))
-        shared_docs = session.exec(shared_docs_statement).all()
-    
-    all_docs_dict = {doc.id: doc for doc in owned_docs}
-    for doc in shared_docs:
-        if doc.id not in all_docs_dict:
-             all_docs_dict[doc.id] = doc
-    return list(all_docs_dict.values())
+    return or_(models.Document.owner_id == user_id, shared), shared
+
+def get_documents_for_user(
+    session: Session,
+    user_id: int,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    shared_with_me: bool = False,
+    content_type: Optional[str] = None,
+    uploaded_after: Optional[datetime] = None,
+    uploaded_before: Optional[datetime] = None,
+) -> Tuple[List[models.Document], Optional[str]]:
+    """Documents the user owns or may view, newest first, one page at a time.
+
+    Pages are keyed on (upload_date, id) so every page costs the same regardless of depth.
+    """
+    viewable, shared = _viewable_by(user_id)
+    statement = (
+        select(models.Document)
+        .where(viewable)
+        .options(joinedload(models.Document.owner))
+        .order_by(models.Document.upload_date.desc(), models.Document.id.desc())
+        .limit(limit + 1)
+    )
+    if owner_id is not None:
+        statement = statement.where(models.Document.owner_id == owner_id)
+    if shared_with_me:
+        statement = statement.where(models.Document.owner_id != user_id, shared)
+    if content_type is not None:
+        statement = statement.where(models.Document.content_type == content_type)
+    if uploaded_after is not None:
+        statement = statement.where(models.Document.upload_date >= uploaded_after)
+    if uploaded_before is not None:
+        statement = statement.where(models.Document.upload_date < uploaded_before)
+    if cursor is not None:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        statement = statement.where(or_(
+            models.Document.upload_date < cursor_date,
+            and_(models.Document.upload_date == cursor_date, models.Document.id < cursor_id)
+        ))
 
+    documents = list(session.exec(statement).all())
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor(documents[-1])
+    return documents, next_cursor
+
+
+def search_documents_for_user(session: Session, user_id: int, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[models.Document], bool]:
+    viewable, _ = _viewable_by(user_id)
+    return search.search_documents(session, query, viewable, limit, offset)
 
 def get_document_with_details(session: Session, document_id: int, user_id: int) -> Optional[models.Document]:
-    doc = get_document(session, document_id, user_id)
-    if not doc:
+    """Load a document with its owner, permissions and current-version signatures in three queries."""
+    viewable, _ = _viewable_by(user_id)
+    statement = (
+        select(models.Document)
+        .where(models.Document.id == document_id, viewable)
+        .options(
+            joinedload(models.Document.owner),
+            selectinload(models.Document.permissions).joinedload(models.DocumentPermission.user_obj),
+        )
+    )
+    doc = session.exec(statement).first()
+    if doc is None:
         return None
-
-    session.refresh(doc, attribute_names=["owner", "permissions", "signatures"])
-    for perm in doc.permissions:
-        if perm.user_obj:
-            session.refresh(perm.user_obj)
-        else:
-            pass
-    for sig in doc.signatures:
-        if sig.signer:
-            session.refresh(sig.signer)
+    signatures = session.exec(
+        select(models.Signature)
+        .where(models.Signature.document_id == document_id, models.Signature.version == doc.version)
+        .options(joinedload(models.Signature.signer))
+    ).all()
+    # Signatures on earlier versions stay in the table but do not apply to the current file.
+    set_committed_value(doc, "signatures", list(signatures))
     return doc
 
+def get_document_versions(session: Session, document_id: int, user_id: int) -> Optional[List[models.DocumentVersion]]:
+    """All versions, newest first; None when the document is not visible to `user_id`."""
+    if get_document(session, document_id=document_id, user_id=user_id) is None:
+        return None
+    return session.exec(
+        select(models.DocumentVersion)
+        .where(models.DocumentVersion.document_id == document_id)
+        .order_by(models.DocumentVersion.version.desc())
+    ).all()
+
+def get_document_version(session: Session, document_id: int, version: int, user_id: int) -> Optional[models.DocumentVersion]:
+    viewable, _ = _viewable_by(user_id)
+    return session.exec(
+        select(models.DocumentVersion)
+        .join(models.Document, models.Document.id == models.DocumentVersion.document_id)
+        .where(models.DocumentVersion.document_id == document_id, models.DocumentVersion.version == version, viewable)
+        .options(joinedload(models.DocumentVersion.blob))
+    ).first()
+
 def grant_permission(
     session: Session,
     document_id: int,
@@ -122,127 +412,173 @@ def grant_permission(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Пользователь с ID {user_id_to_grant} не найден"
         )
-    existing_permission = session.exec(
-        select(models.DocumentPermission).where(
-            models.DocumentPermission.document_id == document_id,
-            models.DocumentPermission.user_id == user_id_to_grant
-        )
-    ).first()
+    statement = _insert(session, models.DocumentPermission).values(
+        document_id=document_id,
+        user_id=user_id_to_grant,
+        can_view=can_view,
+        can_sign=can_sign,
+        granted_at=datetime.utcnow()
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=["document_id", "user_id"],
+        set_={"can_view": statement.excluded.can_view, "can_sign": statement.excluded.can_sign}
+    )
+    permission = session.scalars(
+        statement.returning(models.DocumentPermission),
+        execution_options={"populate_existing": True}
+    ).one()
+    _touch_document(session, document_id)
+    session.commit()
+    acl.invalidate(document_id, user_id_to_grant)
+    set_committed_value(permission, "user_obj", target_user)
+    return permission
+
+def grant_permissions_bulk(
+    session: Session,
+    document_id: int,
+    owner_id: int,
+    shares: List[schemas.ShareDocumentRequest]
+) -> Optional[List[schemas.BulkShareResult]]:
+    """Upsert permissions for many users with one user lookup, one statement and one commit."""
+    doc = session.get(models.Document, document_id)
+    if not doc or doc.owner_id != owner_id:
+        return None
 
-    if existing_permission:
-        existing_permission.can_view = can_view
-        existing_permission.can_sign = can_sign
-        session.add(existing_permission)
-    else:
-        existing_permission = models.DocumentPermission(
-            document_id=document_id,
-            user_id=user_id_to_grant,
-            can_view=can_view,
-            can_sign=can_sign
+    # The last entry for an email wins; ON CONFLICT may not touch the same row twice.
+    requested = {share.email: share for share in shares}
+    users = session.exec(select(models.User).where(models.User.email.in_(list(requested)))).all()
+    users_by_email = {user.email: user for user in users}
+
+    permissions_by_user = {}
+    if users:
+        granted_at = datetime.utcnow()
+        statement = _insert(session, models.DocumentPermission).values([
+            {
+                "document_id": document_id,
+                "user_id": user.id,
+                "can_view": requested[user.email].can_view,
+                "can_sign": requested[user.email].can_sign,
+                "granted_at": granted_at,
+            }
+            for user in users
+        ])
+        statement = statement.on_conflict_do_update(
+            index_elements=["document_id", "user_id"],
+            set_={"can_view": statement.excluded.can_view, "can_sign": statement.excluded.can_sign}
         )
-        session.add(existing_permission)
-    
-    session.commit()
-    session.refresh(existing_permission)
-    return existing_permission
+        permissions = session.scalars(
+            statement.returning(models.DocumentPermission),
+            execution_options={"populate_existing": True}
+        ).all()
+        _touch_document(session, document_id)
+        session.commit()
+        users_by_id = {user.id: user for user in users}
+        for permission in permissions:
+            set_committed_value(permission, "user_obj", users_by_id[permission.user_id])
+        permissions_by_user = {permission.user_id: permission for permission in permissions}
+        for user in users:
+            acl.invalidate(document_id, user.id)
+
+    results = []
+    for email in requested:
+        user = users_by_email.get(email)
+        if user is None:
+            results.append(schemas.BulkShareResult(email=email, granted=False, detail="User with this email not found"))
+        else:
+            results.append(schemas.BulkShareResult(
+                email=email,
+                granted=True,
+                permission=models.DocumentPermissionRead.model_validate(permissions_by_user[user.id])
+            ))
+    return results
 
 def create_signature(session: Session, document_id: int, signer_id: int, signature_in: models.SignatureCreate) -> Optional[models.Signature]:
-    doc = session.get(models.Document, document_id)
-    if not doc:
+    access = get_access(session, document_id, signer_id)
+    if access is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
 
-    can_sign_this_document = False
-    permission = session.exec(
-        select(models.DocumentPermission).where(
-            models.DocumentPermission.document_id == document_id,
-            models.DocumentPermission.user_id == signer_id,
-            models.DocumentPermission.can_sign == True
-        )
-    ).first()
-    if permission:
-        can_sign_this_document = True
-    
-    if not can_sign_this_document:
+    if not access.can_sign:
          raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User does not have permission to sign this document.")
 
-    existing_signature = session.exec(
-        select(models.Signature).where(
-            models.Signature.document_id == document_id,
-            models.Signature.signer_id == signer_id
-        )
-    ).first()
-    if existing_signature:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Document already signed by this user.")
-
     db_signature = models.Signature(
         document_id=document_id,
+        # Resolved in the INSERT itself, so a concurrent replace cannot attach it to the wrong file.
+        version=select(models.Document.version).where(models.Document.id == document_id).scalar_subquery(),
         signer_id=signer_id,
         comments=signature_in.comments
     )
     session.add(db_signature)
-    session.commit()
+    try:
+        # The touch flushes the INSERT, so a duplicate is rejected here.
+        _touch_document(session, document_id)
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Document already signed by this user.")
     session.refresh(db_signature)
     if db_signature.signer:
         session.refresh(db_signature.signer)
     return db_signature
 
 def delete_document(session: Session, document_id: int, owner_id: int) -> bool:
-    doc = session.get(models.Document, document_id)
-    if not doc:
-        return False
-    if doc.owner_id != owner_id:
-        return False
+    return bool(delete_documents(session, [document_id], owner_id))
 
-    file_path = UPLOAD_DIR / doc.filename
-    if file_path.exists():
-        os.remove(file_path)
+def delete_documents(session: Session, document_ids: List[int], owner_id: int) -> List[int]:
+    """Delete those of `document_ids` owned by `owner_id` in one transaction; returns the ids deleted.
 
-    session.exec(select(models.DocumentPermission).where(models.DocumentPermission.document_id == document_id)).all()
-    for perm in session.exec(select(models.DocumentPermission).where(models.DocumentPermission.document_id == document_id)).all():
-        session.delete(perm)
-    
-    for sig in session.exec(select(models.Signature).where(models.Signature.document_id == document_id)).all():
-        session.delete(sig)
+    Dependent rows go with one DELETE per table; unreferenced files are removed after the commit.
+    """
+    deleted_ids = session.exec(
+        select(models.Document.id)
+        .where(models.Document.id.in_(document_ids), models.Document.owner_id == owner_id)
+    ).all()
+    if not deleted_ids:
+        return []
+    # Every version holds one reference to its file.
+    references = Counter(session.exec(
+        select(models.DocumentVersion.filename).where(models.DocumentVersion.document_id.in_(deleted_ids))
+    ).all())
 
-    session.delete(doc)
+    for model in (models.DocumentPermission, models.Signature, models.ProcessingJob, models.DocumentVersion):
+        session.execute(delete(model).where(model.document_id.in_(deleted_ids)))
+    search.remove_documents(session, deleted_ids)
+    session.execute(delete(models.Document).where(models.Document.id.in_(deleted_ids)))
+    reclamation.reclaimer.defer(session, _unlink_blobs(session, references))
     session.commit()
-    return True
+    acl.invalidate_many(deleted_ids)
+    return deleted_ids
 
-def update_document(session: Session, document_id: int, owner_id: int, doc_update: models.DocumentCreate, new_file_path: Optional[Path] = None) -> Optional[models.Document]:
+def update_document(session: Session, document_id: int, owner_id: int, doc_update: models.DocumentUpdate, new_blob: Optional[storage.StoredBlob] = None) -> Optional[models.Document]:
+    """Update metadata, and with `new_blob` (already in storage) append a new version; earlier versions and their signatures are kept."""
     doc = session.get(models.Document, document_id)
     if not doc:
         return None
     if doc.owner_id != owner_id:
         return None
-    
-    if new_file_path:
-        signatures = session.exec(
-            select(models.Signature).where(
-                models.Signature.document_id == document_id
-            )
-        ).all()
-        
-    for signature in signatures:
-        session.delete(signature)
-        
-    session.commit()
 
-    update_data = doc_update.model_dump(exclude_unset=True)
+    # Without a new file the file columns are left as they are, so a replace
+    # committed since the caller read the document is not undone.
+    update_data = doc_update.model_dump(exclude_unset=True, include=None if new_blob else {"title", "description"})
     for key, value in update_data.items():
         setattr(doc, key, value)
 
-    if new_file_path:
-        old_file_path = UPLOAD_DIR / doc.filename
-        if old_file_path.exists():
-            os.remove(old_file_path)
-        
-        doc.filename = new_file_path.name
-        doc.original_filename = doc_update.original_filename
-        doc.content_type = doc_update.content_type
-        doc.upload_date = doc_update.upload_date
+    if new_blob:
+        doc.filename = new_blob.key
+        doc.sha256 = new_blob.key
+        doc.size = new_blob.size
+        # Incremented in the UPDATE, so concurrent replaces get distinct numbers.
+        doc.version = models.Document.version + 1
+        _link_blob(session, new_blob)
+        session.add(doc)
+        session.flush()
+        session.add(_new_version(doc))
+        processing.enqueue(session, doc)
 
     session.add(doc)
+    # A new file invalidates the previously extracted text.
+    search.index_document(session, doc, content="" if new_blob else None)
     session.commit()
+    acl.invalidate(document_id)
     session.refresh(doc)
     session.refresh(doc, attribute_names=["owner"])
     return doc
@@ -277,6 +613,6 @@ def get_users_with_document_access(session: Session, document_id: int) -> List[s
                 )
             )
         else:
-            print(f"Warning: User with ID {perm.user_id} not found for permission ID {perm.id}")
+            logger.warning("User with ID %s not found for permission ID %s", perm.user_id, perm.id)
             
     return user_access_list
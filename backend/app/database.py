@@ -1,7 +1,144 @@
-from sqlmodel import create_engine, SQLModel
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from pathlib import Path
+from typing import List, Optional, Tuple
+import logging
+import time
+from sqlalchemy import event
+from alembic import command
+from alembic.config import Config
+from sqlmodel import create_engine
+from app import logs, metrics
 from app.config import settings
 
-engine = create_engine(settings.DATABASE_URL, echo=True)
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def to_async_url(database_url: str) -> str:
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+def _engine_options(database_url: str) -> dict:
+    # Requests hop between threadpool workers, so SQLite connections must not be pinned to one thread.
+    if make_url(database_url).get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}
+    if not settings.DB_TUNING:
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _tuning_statements(dialect_name: str) -> List[str]:
+    if dialect_name == "sqlite":
+        return [
+            f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}",
+            f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}",
+            f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+            # A negative cache_size is in KiB rather than pages.
+            f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}",
+            f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}",
+        ]
+    if dialect_name == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        return [f"SET statement_timeout = {int(settings.DB_STATEMENT_TIMEOUT_MS)}"]
+    return []
+
+
+def tune_connections(target) -> None:
+    """Run the tuning profile on each new DBAPI connection of `target` (a sync Engine)."""
+    statements = _tuning_statements(target.dialect.name)
+    if not statements:
+        return
+
+    def configure(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    event.listen(target, "connect", configure)
+
+
+slow_query_logger = logging.getLogger("app.db.slow")
+
+
+def _start_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+
+def _log_if_slow(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["slow_query_start"].pop()
+    if elapsed < settings.SLOW_QUERY_SECONDS:
+        return
+    # Parameters are left out on purpose: they can hold password hashes and document text.
+    normalized = logs.fingerprint_statement(statement)
+    fingerprint = logs.fingerprint_id(normalized)
+    slow_query_logger.warning(
+        "Slow query (%.1f ms) [%s]: %s", elapsed * 1000, fingerprint,
+        logs.truncate(normalized, settings.SLOW_QUERY_LOG_MAX_CHARS),
+        extra={"duration_ms": round(elapsed * 1000, 1), "fingerprint": fingerprint, "executemany": executemany},
+    )
+
+
+def _drop_timer(exception_context):
+    starts = exception_context.connection.info.get("slow_query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+def log_slow_queries(target) -> None:
+    event.listen(target, "before_cursor_execute", _start_timer)
+    event.listen(target, "after_cursor_execute", _log_if_slow)
+    event.listen(target, "handle_error", _drop_timer)
+
+
+def _configure_engine(target, name: str) -> None:
+    if settings.DB_TUNING:
+        tune_connections(target)
+    if settings.SLOW_QUERY_SECONDS > 0:
+        log_slow_queries(target)
+    metrics.instrument_engine(target, name)
+
+
+def _create_engines(database_url: str, sync_name: str, async_name: str) -> Tuple[Engine, Optional[AsyncEngine]]:
+    """A sync engine for `database_url` and, with DB_ASYNC, an async one, both tuned and instrumented."""
+    # Statement logging is controlled by SQL_ECHO through app.logs, not by echo=True.
+    sync_engine = create_engine(database_url, **_engine_options(database_url))
+    _configure_engine(sync_engine, sync_name)
+    if not settings.DB_ASYNC:
+        return sync_engine, None
+    async_engine = create_async_engine(to_async_url(database_url), **_engine_options(database_url))
+    _configure_engine(async_engine.sync_engine, async_name)
+    return sync_engine, async_engine
+
+
+engine, async_engine = _create_engines(settings.DATABASE_URL, "sync", "async")
+
+# Read replicas are only ever read from; migrations and writes go to the primary.
+REPLICA_URLS = [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+_replicas = [
+    _create_engines(url, f"replica{i}", f"replica{i}-async") for i, url in enumerate(REPLICA_URLS, start=1)
+]
+replica_engines: List[Engine] = [sync_engine for sync_engine, _ in _replicas]
+async_replica_engines: List[AsyncEngine] = [replica for _, replica in _replicas if replica is not None]
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+
+def run_migrations():
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
@@ -1,6 +1,114 @@
+from typing import Any, Callable, Optional, TypeVar, Union
+import random
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
 from sqlmodel import Session
-from app.database import engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app import metrics
+from app.cache import TTLCache
+from app.config import settings
+from app.database import async_engine, async_replica_engines, engine, replica_engines
+from app.invalidation import channel, held_publishes
 
-def get_session():
-    with Session(engine) as session:
-        yield session
\ No newline at end of file
+T = TypeVar("T")
+
+# Users whose own writes may not have reached the replicas yet; their reads stay on the primary.
+recent_writers = TTLCache(maxsize=10000, ttl=settings.READ_YOUR_WRITES_SECONDS)
+metrics.register_cache("recent_writers", recent_writers)
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _note_commit(session):
+    session.info["committed"] = True
+
+
+def mark_write(user_id: int) -> None:
+    channel.publish({"type": "write", "user_id": user_id})
+
+
+def _apply_write(message: dict) -> None:
+    if message.get("type") == "write":
+        recent_writers.set(message["user_id"], True)
+
+
+channel.subscribe(_apply_write)
+
+
+class DB:
+    """Request-scoped handle that runs blocking crud functions without stalling the event loop.
+
+    In sync mode the call is sent to the threadpool with a regular `Session`. With
+    `DB_ASYNC` enabled the same function runs on an `AsyncSession` connection through
+    `run_sync`, so aiosqlite/asyncpg do the I/O and crud keeps a single implementation.
+    """
+
+    def __init__(self, session: Union[Session, AsyncSession], request: Optional[Request] = None):
+        self.session = session
+        # Set for primary sessions, so a commit made for an authenticated user can pin their reads.
+        self.request = request
+
+    @property
+    def is_async(self) -> bool:
+        return isinstance(self.session, AsyncSession)
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        # run_sync and mark_write run on the event loop, so cache invalidations are sent from the threadpool.
+        with held_publishes() as messages:
+            try:
+                if self.is_async:
+                    result = await self.session.run_sync(fn, *args, **kwargs)
+                else:
+                    result = await run_in_threadpool(fn, self.session, *args, **kwargs)
+                if self.request is not None:
+                    info = self.session.sync_session.info if self.is_async else self.session.info
+                    principal = getattr(self.request.state, "principal", None)
+                    if info.pop("committed", False) and principal is not None:
+                        mark_write(principal.id)
+            finally:
+                if messages:
+                    await run_in_threadpool(channel.send, messages)
+        return result
+
+
+async def get_async_session():
+    if async_engine is None:
+        raise RuntimeError("DB_ASYNC is disabled; no async engine is configured")
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+async def get_db(request: Request):
+    if settings.DB_ASYNC:
+        async for session in get_async_session():
+            yield DB(session, request)
+        return
+    session = Session(engine, expire_on_commit=False)
+    try:
+        yield DB(session, request)
+    finally:
+        await run_in_threadpool(session.close)
+
+async def get_read_db(request: Request):
+    """Like get_db, but on a read replica when one is configured, for routes that never write.
+
+    Declare it after the route's auth dependency: the caller must be known to keep a user who
+    has just written on the primary. Without a known caller the primary is used.
+    """
+    principal = getattr(request.state, "principal", None)
+    if not replica_engines or principal is None or recent_writers.get(principal.id):
+        async for db in get_db(request):
+            yield db
+        return
+    if settings.DB_ASYNC:
+        async with AsyncSession(random.choice(async_replica_engines), expire_on_commit=False) as session:
+            session.sync_session.info["replica"] = True
+            yield DB(session)
+        return
+    session = Session(random.choice(replica_engines), expire_on_commit=False)
+    # Tells crud that what it reads may lag behind the primary.
+    session.info["replica"] = True
+    try:
+        yield DB(session)
+    finally:
+        await run_in_threadpool(session.close)
@@ -0,0 +1,143 @@
+"""CPU-bound document analysis. Everything here runs inside worker processes.
+
+Optional libraries are used when installed: pypdf for PDF text and page counts,
+Pillow for image previews and PyMuPDF (fitz) for PDF first-page previews.
+"""
+from pathlib import Path
+from typing import Optional
+import mimetypes
+import re
+import zipfile
+
+_SIGNATURES = [
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),
+    (b"{\\rtf", "application/rtf"),
+]
+
+_ZIP_MARKERS = [
+    ("word/document.xml", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    ("xl/workbook.xml", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    ("ppt/presentation.xml", "application/vnd.openxmlformats-officedocument.presentationml.presentation"),
+]
+
+_XML_TAG = re.compile(rb"<[^>]+>")
+_PDF_PAGE = re.compile(rb"/Type\s*/Page[^s]")
+
+
+def sniff_mime(path: Path, filename: Optional[str] = None) -> str:
+    with path.open("rb") as f:
+        head = f.read(4096)
+    for magic, mime in _SIGNATURES:
+        if head.startswith(magic):
+            return mime
+    if head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                names = set(archive.namelist())
+                if "mimetype" in names:
+                    return archive.read("mimetype").decode("ascii", "ignore").strip() or "application/zip"
+        except zipfile.BadZipFile:
+            return "application/octet-stream"
+        for marker, mime in _ZIP_MARKERS:
+            if marker in names:
+                return mime
+        return "application/zip"
+    lowered = head.lstrip().lower()
+    if lowered.startswith(b"<?xml"):
+        return "application/xml"
+    if lowered.startswith((b"<!doctype html", b"<html")):
+        return "text/html"
+    if _looks_like_text(head):
+        guessed = mimetypes.guess_type(filename or "")[0]
+        if guessed and (guessed.startswith("text/") or guessed in ("application/json", "application/xml")):
+            return guessed
+        return "text/plain"
+    return mimetypes.guess_type(filename or "")[0] or "application/octet-stream"
+
+
+def _looks_like_text(head: bytes) -> bool:
+    if b"\x00" in head:
+        return False
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character may be cut off at the end of the sample.
+        return e.start >= len(head) - 3
+    return True
+
+
+def _pdf_text_and_pages(path: Path, max_chars: int):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return "", len(_PDF_PAGE.findall(path.read_bytes())) or None
+    reader = PdfReader(str(path))
+    parts, total = [], 0
+    for page in reader.pages:
+        if total >= max_chars:
+            break
+        text = page.extract_text() or ""
+        parts.append(text)
+        total += len(text)
+    return "\n".join(parts)[:max_chars], len(reader.pages)
+
+
+def _office_text(path: Path, max_chars: int) -> str:
+    with zipfile.ZipFile(path) as archive:
+        names = [name for name in archive.namelist()
+                 if name in ("word/document.xml", "content.xml") or name.startswith(("ppt/slides/slide", "xl/sharedStrings"))]
+        parts = [_XML_TAG.sub(b" ", archive.read(name)).decode("utf-8", "ignore") for name in names]
+    return re.sub(r"\s+", " ", " ".join(parts)).strip()[:max_chars]
+
+
+def _render_preview(path: Path, mime: str, target: Path, size: int) -> bool:
+    if mime.startswith("image/"):
+        try:
+            from PIL import Image
+        except ImportError:
+            return False
+        with Image.open(path) as image:
+            image.thumbnail((size, size))
+            image.convert("RGB").save(target, "PNG")
+        return True
+    if mime == "application/pdf":
+        try:
+            import fitz
+        except ImportError:
+            return False
+        with fitz.open(path) as pdf:
+            if pdf.page_count == 0:
+                return False
+            page = pdf.load_page(0)
+            zoom = size / max(page.rect.width, page.rect.height)
+            page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).save(str(target))
+        return True
+    return False
+
+
+def analyze(path: str, filename: Optional[str], preview_path: str, max_chars: int, preview_size: int) -> dict:
+    """Sniff, extract and render a stored file; returns plain data so it can cross the process boundary."""
+    source = Path(path)
+    mime = sniff_mime(source, filename)
+    text, page_count = "", None
+    if mime == "application/pdf":
+        text, page_count = _pdf_text_and_pages(source, max_chars)
+    elif mime.startswith("text/") or mime in ("application/json", "application/xml"):
+        with source.open("rb") as f:
+            text = f.read(max_chars * 4).decode("utf-8", "replace")[:max_chars]
+    elif mime.startswith("application/vnd.openxmlformats") or mime.startswith("application/vnd.oasis.opendocument"):
+        text = _office_text(source, max_chars)
+    elif mime.startswith("image/"):
+        page_count = 1
+    has_preview = _render_preview(source, mime, Path(preview_path), preview_size)
+    return {"content_type": mime, "text": text, "page_count": page_count, "has_preview": has_preview}
@@ -0,0 +1,107 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, List, Optional
+import json
+import logging
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[dict], None]
+
+# Messages whose network publish was held back by `held_publishes`, for the current request's context.
+_held: ContextVar[Optional[List[dict]]] = ContextVar("held_publishes", default=None)
+
+
+@contextmanager
+def held_publishes() -> Iterator[List[dict]]:
+    """Collect the messages published inside the block instead of sending them to other workers.
+
+    Handlers in this worker still run at once; the caller passes the collected messages to
+    `channel.send` afterwards, e.g. from the threadpool when the block ran on the event loop.
+    """
+    messages: List[dict] = []
+    token = _held.set(messages)
+    try:
+        yield messages
+    finally:
+        _held.reset(token)
+
+
+class LocalInvalidationChannel:
+    """In-process channel: delivers every message straight to this worker's handlers."""
+
+    def __init__(self):
+        self._handlers: List[Handler] = []
+
+    def subscribe(self, handler: Handler) -> None:
+        self._handlers.append(handler)
+
+    def publish(self, message: dict) -> None:
+        for handler in self._handlers:
+            handler(message)
+
+    def start(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class RedisInvalidationChannel:
+    """Fans invalidation messages out to every worker through Redis pub/sub."""
+
+    def __init__(self, url: Optional[str] = None, channel: str = "document-flow:invalidate", client=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.channel = channel
+        self._handlers: List[Handler] = []
+        self._thread = None
+
+    def subscribe(self, handler: Handler) -> None:
+        self._handlers.append(handler)
+
+    def start(self) -> None:
+        if self._thread is None:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: self._dispatch})
+            self._thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def _dispatch(self, raw: dict) -> None:
+        message = json.loads(raw["data"])
+        for handler in self._handlers:
+            handler(message)
+
+    def publish(self, message: dict) -> None:
+        # Apply locally right away; the echo from Redis is idempotent.
+        for handler in self._handlers:
+            handler(message)
+        held = _held.get()
+        if held is not None:
+            held.append(message)
+        else:
+            self.send([message])
+
+    def send(self, messages: List[dict]) -> None:
+        """Publish `messages` to Redis. Blocks on the network, so keep it off the event loop."""
+        for message in messages:
+            try:
+                self.client.publish(self.channel, json.dumps(message))
+            except Exception:
+                logger.exception("Could not publish cache invalidation %s", message)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+
+
+def create_channel(redis_url: Optional[str]):
+    if redis_url:
+        return RedisInvalidationChannel(redis_url)
+    return LocalInvalidationChannel()
+
+
+channel = create_channel(settings.INVALIDATION_REDIS_URL)
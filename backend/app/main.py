@@ -1,24 +1,45 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from app.database import create_db_and_tables
+from app.database import run_migrations, async_engine, async_replica_engines
+from app.invalidation import channel
+from app import processing, reclamation
+from fastapi.concurrency import run_in_threadpool
 from .routers import documents, users
 from app.config import settings
 from fastapi.middleware.cors import CORSMiddleware
+from app.middleware import MaxBodySizeMiddleware, MetricsMiddleware
+from app import metrics
+from app.logs import configure_logging, truncate
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi import FastAPI, Request
+from starlette.datastructures import UploadFile
 import logging
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Creating database and tables...")
-    create_db_and_tables()
-    print("Database and tables created.")
-    print(f"Ensuring upload directory exists: {settings.UPLOAD_DIR}")
+    logger.info("Applying database migrations...")
+    run_migrations()
+    logger.info("Database is up to date.")
+    logger.info("Ensuring upload directory exists: %s", settings.UPLOAD_DIR)
     settings.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-    print("Upload directory ensured.")
+    settings.STAGING_DIR.mkdir(parents=True, exist_ok=True)
+    channel.start()
+    logger.info("Upload directory ensured.")
+    if settings.PROCESSING_ENABLED:
+        await processing.runner.start()
     yield
-    print("Application shutdown.")
+    await processing.runner.stop()
+    await run_in_threadpool(reclamation.reclaimer.stop)
+    if async_engine is not None:
+        await async_engine.dispose()
+    for replica in async_replica_engines:
+        await replica.dispose()
+    channel.close()
+    logger.info("Application shutdown.")
 
 app = FastAPI(lifespan=lifespan, title="Система Документооборота")
 
@@ -30,18 +51,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Leave room for the multipart framing and the other form fields.
+app.add_middleware(MaxBodySizeMiddleware, max_size=settings.MAX_UPLOAD_SIZE + 1024 * 1024)
+
+# Outermost, so rejected and failed requests are counted too.
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(users.router)
 app.include_router(documents.router)
 
+def _describe_input(value) -> str:
+    # Only describe uploads; reading them here would buffer the whole file.
+    if isinstance(value, UploadFile):
+        return f"<file {value.filename!r}>"
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    return truncate(value, 200)
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    logging.error(f"Validation error: {exc.errors()}")
-    logging.error(f"Request body: {await request.body()}")
+    errors = [
+        {"loc": error.get("loc"), "msg": error.get("msg"), "input": _describe_input(error.get("input"))}
+        for error in exc.errors()[:20]
+    ]
+    logger.warning(
+        "Validation error on %s %s: %s", request.method, request.url.path,
+        truncate(errors, settings.VALIDATION_LOG_MAX_CHARS),
+        extra={
+            "error_count": len(exc.errors()),
+            "content_type": request.headers.get("content-type"),
+            "content_length": request.headers.get("content-length"),
+        },
+    )
     return JSONResponse(
         status_code=400,
         content={"detail": exc.errors()},
     )
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint():
+        return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/")
 async def root():
     return {"message": "Добро пожаловать в систему документооборота!"}
\ No newline at end of file
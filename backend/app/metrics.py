@@ -0,0 +1,255 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Counters and histograms are updated as requests run; gauges are callbacks read at scrape time.
+With several worker processes each one reports its own numbers, so scrape them individually.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        return []
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (the last slot is +Inf), sum of observations.
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}"
+
+
+class CallbackMetric(Metric):
+    """Values produced at scrape time by `collect`, as (label values, value) pairs."""
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+                 labelnames: Sequence[str] = (), kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self.collect():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name: str, documentation: str, collect, labelnames: Sequence[str] = (), kind: str = "gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, collect, labelnames, kind))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time from receiving a request to sending the last body byte.", ("method", "route"))
+http_request_body_bytes = registry.counter(
+    "http_request_body_bytes_total", "Request body bytes received (uploads).", ("route",))
+http_response_body_bytes = registry.counter(
+    "http_response_body_bytes_total", "Response body bytes sent (downloads).", ("route",))
+
+db_queries = registry.counter("db_queries_total", "SQL statements executed.")
+db_query_duration = registry.histogram("db_query_duration_seconds", "Duration of single SQL statements.")
+db_queries_per_request = registry.histogram(
+    "db_queries_per_request", "SQL statements executed while serving one request.", ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100))
+db_time_per_request = registry.histogram(
+    "db_time_per_request_seconds", "Total SQL statement time while serving one request.", ("route",))
+auth_db_lookups_per_request = registry.histogram(
+    "auth_db_lookups_per_request", "User lookups that missed the user cache while serving one authenticated request.",
+    ("route",), buckets=(0, 1, 2))
+db_pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent obtaining a connection from the pool, including opening one.", ("engine",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0))
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds", "auth_db_lookups")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        # None until the request is authenticated with a bearer token.
+        self.auth_db_lookups: Optional[int] = None
+
+
+# Mutable and shared by reference, so work sent to the threadpool or run_sync greenlets counts toward the request.
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    db_queries.inc()
+    db_query_duration.observe(elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+
+_pools: Dict[str, object] = {}
+_caches: Dict[str, object] = {}
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Count and time every statement on `engine` and the waits for its pool, labelled `name`."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+    # The pool has no event before a checkout starts, so time Engine.connect(), which Session and
+    # AsyncConnection call for every connection they check out; it also covers opening new ones.
+    connect = engine.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            db_pool_checkout_wait.observe(time.perf_counter() - start, engine=name)
+
+    engine.connect = timed_connect
+    _pools[name] = engine.pool
+
+
+def register_cache(name: str, cache) -> None:
+    """Expose a TTLCache's hit/miss counters and size under the `cache` label."""
+    _caches[name] = cache
+
+
+def _pool_samples():
+    for name, pool in sorted(_pools.items()):
+        # Only queue-style pools track checkouts; SQLite's in-memory and static pools do not.
+        if hasattr(pool, "checkedout"):
+            yield (name,), pool.checkedout()
+
+
+def _cache_samples(attribute: str):
+    def collect():
+        for name, cache in sorted(_caches.items()):
+            yield (name,), len(cache) if attribute == "entries" else getattr(cache, attribute)
+    return collect
+
+
+registry.callback("db_pool_checked_out", "Connections currently checked out of the pool.", _pool_samples, ("engine",))
+registry.callback("cache_hits_total", "Cache lookups that found a live entry.", _cache_samples("hits"), ("cache",), "counter")
+registry.callback("cache_misses_total", "Cache lookups that found nothing or an expired entry.", _cache_samples("misses"), ("cache",), "counter")
+registry.callback("cache_hit_ratio", "Hits over all lookups since start.", _cache_samples("hit_rate"), ("cache",))
+registry.callback("cache_entries", "Entries currently held.", _cache_samples("entries"), ("cache",))
@@ -0,0 +1,92 @@
+import time
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app import metrics
+
+
+class MaxBodySizeMiddleware:
+    """Rejects request bodies over `max_size` bytes before they are buffered by form parsing."""
+
+    def __init__(self, app: ASGIApp, max_size: int):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request body exceeds the limit of {self.max_size} bytes."
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_size:
+            response = JSONResponse(status_code=413, content={"detail": detail})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            # Chunked bodies have no Content-Length, so count as they arrive.
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_size:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+class MetricsMiddleware:
+    """Records latency, body bytes and database work per route template."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+        received = 0
+        sent = 0
+
+        async def counting_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+            return message
+
+        async def counting_send(message: Message) -> None:
+            nonlocal status_code, sent
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, counting_receive, counting_send)
+        finally:
+            metrics.current_request.reset(token)
+            # The template ("/documents/getDocument/{document_id}/"), never the raw path, keeps label values bounded.
+            route = scope.get("route")
+            template = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            metrics.http_requests.inc(method=method, route=template, status=str(status_code))
+            metrics.http_request_duration.observe(time.perf_counter() - start, method=method, route=template)
+            if received:
+                metrics.http_request_body_bytes.inc(received, route=template)
+            if sent:
+                metrics.http_response_body_bytes.inc(sent, route=template)
+            metrics.db_queries_per_request.observe(stats.queries, route=template)
+            metrics.db_time_per_request.observe(stats.query_seconds, route=template)
+            if stats.auth_db_lookups is not None:
+                metrics.auth_db_lookups_per_request.observe(stats.auth_db_lookups, route=template)
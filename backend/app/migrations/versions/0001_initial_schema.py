@@ -0,0 +1,89 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+Databases created by SQLModel.metadata.create_all before migrations existed
+already have these tables, so each one is only created when missing.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'user' not in existing:
+        op.create_table(
+            'user',
+            sa.Column('email', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('full_name', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('hashed_password', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('is_active', sa.Boolean(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_user_email', 'user', ['email'], unique=True)
+
+    if 'document' not in existing:
+        op.create_table(
+            'document',
+            sa.Column('title', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('description', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+            sa.Column('filename', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('original_filename', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('content_type', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+            sa.Column('upload_date', sa.DateTime(), nullable=False),
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('owner_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['owner_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+    if 'documentpermission' not in existing:
+        op.create_table(
+            'documentpermission',
+            sa.Column('can_view', sa.Boolean(), nullable=False),
+            sa.Column('can_sign', sa.Boolean(), nullable=False),
+            sa.Column('granted_at', sa.DateTime(), nullable=False),
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('document_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['document_id'], ['document.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+    if 'signature' not in existing:
+        op.create_table(
+            'signature',
+            sa.Column('signed_at', sa.DateTime(), nullable=False),
+            sa.Column('comments', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('document_id', sa.Integer(), nullable=False),
+            sa.Column('signer_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['document_id'], ['document.id']),
+            sa.ForeignKeyConstraint(['signer_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id'),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('signature')
+    op.drop_table('documentpermission')
+    op.drop_table('document')
+    op.drop_index('ix_user_email', table_name='user')
+    op.drop_table('user')
@@ -0,0 +1,51 @@
+"""content-addressed blobs
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:10:00
+
+Adds Document.sha256/size and the reference-counted blob table. Guarded like
+0001 because create_all may already have produced them.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    document_columns = {column['name'] for column in inspector.get_columns('document')}
+
+    with op.batch_alter_table('document') as batch_op:
+        if 'sha256' not in document_columns:
+            batch_op.add_column(sa.Column('sha256', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+        if 'size' not in document_columns:
+            batch_op.add_column(sa.Column('size', sa.Integer(), nullable=True))
+
+    if 'blob' not in inspector.get_table_names():
+        op.create_table(
+            'blob',
+            sa.Column('sha256', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+            sa.Column('size', sa.Integer(), nullable=False),
+            sa.Column('ref_count', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('sha256'),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('blob')
+    with op.batch_alter_table('document') as batch_op:
+        batch_op.drop_column('size')
+        batch_op.drop_column('sha256')
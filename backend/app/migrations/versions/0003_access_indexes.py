@@ -0,0 +1,55 @@
+"""indexes and uniqueness for permission and signature lookups
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 12:20:00
+
+Duplicate permission/signature rows that the old read-before-write checks let
+through are collapsed first (the newest permission row wins, the earliest
+signature is kept) so the unique constraints can be created.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        "DELETE FROM documentpermission WHERE id NOT IN "
+        "(SELECT MAX(id) FROM documentpermission GROUP BY document_id, user_id)"
+    )
+    op.execute(
+        "DELETE FROM signature WHERE id NOT IN "
+        "(SELECT MIN(id) FROM signature GROUP BY document_id, signer_id)"
+    )
+
+    with op.batch_alter_table('documentpermission') as batch_op:
+        batch_op.create_unique_constraint('uq_documentpermission_document_id_user_id', ['document_id', 'user_id'])
+        batch_op.create_index('ix_documentpermission_user_id_can_view', ['user_id', 'can_view'])
+
+    with op.batch_alter_table('signature') as batch_op:
+        batch_op.create_unique_constraint('uq_signature_document_id_signer_id', ['document_id', 'signer_id'])
+        batch_op.create_index('ix_signature_signer_id', ['signer_id'])
+
+    op.create_index('ix_document_owner_id_upload_date', 'document', ['owner_id', 'upload_date'])
+    op.create_index('ix_document_upload_date', 'document', ['upload_date'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_document_upload_date', table_name='document')
+    op.drop_index('ix_document_owner_id_upload_date', table_name='document')
+    with op.batch_alter_table('signature') as batch_op:
+        batch_op.drop_index('ix_signature_signer_id')
+        batch_op.drop_constraint('uq_signature_document_id_signer_id', type_='unique')
+    with op.batch_alter_table('documentpermission') as batch_op:
+        batch_op.drop_index('ix_documentpermission_user_id_can_view')
+        batch_op.drop_constraint('uq_documentpermission_document_id_user_id', type_='unique')
@@ -0,0 +1,57 @@
+"""full-text search index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 12:30:00
+
+SQLite gets an FTS5 table keyed by document rowid; PostgreSQL gets a side table
+with a weighted tsvector and a GIN index. Existing documents are backfilled
+from their title and description.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_table(
+            'documentsearch',
+            sa.Column('document_id', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False, server_default=''),
+            sa.Column('tsv', sa.dialects.postgresql.TSVECTOR(), nullable=False),
+            sa.PrimaryKeyConstraint('document_id'),
+        )
+        op.create_index('ix_documentsearch_tsv', 'documentsearch', ['tsv'], postgresql_using='gin')
+        op.execute(
+            "INSERT INTO documentsearch (document_id, content, tsv) "
+            "SELECT id, '', setweight(to_tsvector('simple', title), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B') FROM document"
+        )
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE document_fts USING fts5("
+            "title, description, content, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        op.execute(
+            "INSERT INTO document_fts (rowid, title, description, content) "
+            "SELECT id, title, coalesce(description, ''), '' FROM document"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_documentsearch_tsv', table_name='documentsearch')
+        op.drop_table('documentsearch')
+    else:
+        op.execute("DROP TABLE document_fts")
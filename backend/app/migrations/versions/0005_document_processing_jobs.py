@@ -0,0 +1,57 @@
+"""document processing jobs
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:40:00
+
+Adds the persisted background job queue and the derived document fields it
+fills in. Existing documents are left unprocessed (processing_status NULL).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('document') as batch_op:
+        batch_op.add_column(sa.Column('processing_status', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+        batch_op.add_column(sa.Column('page_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('has_preview', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+    op.create_table(
+        'processingjob',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('blob_key', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['document.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_processingjob_document_id', 'processingjob', ['document_id'])
+    op.create_index('ix_processingjob_status', 'processingjob', ['status'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_processingjob_status', table_name='processingjob')
+    op.drop_index('ix_processingjob_document_id', table_name='processingjob')
+    op.drop_table('processingjob')
+    with op.batch_alter_table('document') as batch_op:
+        batch_op.drop_column('has_preview')
+        batch_op.drop_column('page_count')
+        batch_op.drop_column('processing_status')
@@ -0,0 +1,38 @@
+"""imported files
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 16:20:00
+
+Journal for the bulk import command so interrupted imports can resume.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'importedfile',
+        sa.Column('source', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.Column('imported_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('source'),
+    )
+    op.create_index('ix_importedfile_document_id', 'importedfile', ['document_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_importedfile_document_id', table_name='importedfile')
+    op.drop_table('importedfile')
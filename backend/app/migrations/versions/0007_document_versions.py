@@ -0,0 +1,72 @@
+"""document versions
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:30:00
+
+Adds the documentversion table and the version numbers on document and
+signature. Every existing document becomes version 1 of itself, its
+signatures apply to that version, and blob reference counts are unchanged
+because each version takes over its document's reference.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'documentversion',
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('filename', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('original_filename', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column('content_type', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('sha256', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+        sa.Column('size', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('document_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['document_id'], ['document.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('document_id', 'version', name='uq_documentversion_document_id_version'),
+    )
+
+    with op.batch_alter_table('document') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+    with op.batch_alter_table('signature') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.drop_constraint('uq_signature_document_id_signer_id', type_='unique')
+        batch_op.create_unique_constraint(
+            'uq_signature_document_id_version_signer_id', ['document_id', 'version', 'signer_id']
+        )
+
+    op.execute(
+        "INSERT INTO documentversion "
+        "(document_id, version, filename, original_filename, content_type, sha256, size, created_at) "
+        "SELECT id, 1, filename, original_filename, content_type, sha256, size, upload_date FROM document"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Only the current file of each document survives; earlier versions and their signatures are dropped
+    # (their blobs keep the reference, so the files stay in storage).
+    op.execute("DELETE FROM signature WHERE version <> (SELECT version FROM document WHERE document.id = signature.document_id)")
+    with op.batch_alter_table('signature') as batch_op:
+        batch_op.drop_constraint('uq_signature_document_id_version_signer_id', type_='unique')
+        batch_op.create_unique_constraint('uq_signature_document_id_signer_id', ['document_id', 'signer_id'])
+        batch_op.drop_column('version')
+    with op.batch_alter_table('document') as batch_op:
+        batch_op.drop_column('version')
+    op.drop_table('documentversion')
@@ -0,0 +1,37 @@
+"""blob encoding
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 17:00:00
+
+Records how each blob is stored (NULL for raw bytes, "zstd" for compressed)
+and its size in storage. Existing blobs are raw, so stored_size = size.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('blob') as batch_op:
+        batch_op.add_column(sa.Column('encoding', sqlmodel.sql.sqltypes.AutoString(), nullable=True))
+        batch_op.add_column(sa.Column('stored_size', sa.Integer(), nullable=True))
+    op.execute("UPDATE blob SET stored_size = size")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Compressed blobs would become unreadable; decompress them (or keep this revision) first.
+    with op.batch_alter_table('blob') as batch_op:
+        batch_op.drop_column('stored_size')
+        batch_op.drop_column('encoding')
@@ -0,0 +1,35 @@
+"""document updated_at
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 18:30:00
+
+Adds the modification time used for Last-Modified on document JSON.
+Existing documents start from their upload date.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('document') as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+    op.execute("UPDATE document SET updated_at = upload_date")
+    with op.batch_alter_table('document') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('document') as batch_op:
+        batch_op.drop_column('updated_at')
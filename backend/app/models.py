@@ -1,4 +1,5 @@
 from typing import Optional, List
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import Field, SQLModel, Relationship
 from datetime import datetime
 
@@ -22,36 +23,128 @@ class UserRead(UserBase):
     id: int
     is_active: bool
 
+class Blob(SQLModel, table=True):
+    sha256: str = Field(primary_key=True)
+    # Size of the original content; stored_size is what the encoded object takes up in storage.
+    size: int
+    ref_count: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    encoding: Optional[str] = None
+    stored_size: Optional[int] = None
+
 class DocumentBase(SQLModel):
     title: str
     description: Optional[str] = None
     filename: str
     original_filename: str
     content_type: Optional[str] = None
+    sha256: Optional[str] = None
+    size: Optional[int] = None
     upload_date: datetime = Field(default_factory=datetime.utcnow)
 
 class Document(DocumentBase, table=True):
+    __table_args__ = (
+        Index("ix_document_owner_id_upload_date", "owner_id", "upload_date"),
+        Index("ix_document_upload_date", "upload_date"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     owner_id: int = Field(foreign_key="user.id")
+    # Number of the current DocumentVersion.
+    version: int = Field(default=1)
+    processing_status: Optional[str] = None
+    page_count: Optional[int] = None
+    has_preview: bool = Field(default=False)
+    # Bumped by every change that shows in the document's details: its own columns, shares and signatures.
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
 
     owner: User = Relationship(back_populates="owned_documents")
+    # Files stored before the blob table existed have no row here.
+    blob: Optional[Blob] = Relationship(sa_relationship_kwargs={
+        "primaryjoin": "foreign(Document.filename) == Blob.sha256", "viewonly": True, "uselist": False,
+    })
     permissions: List["DocumentPermission"] = Relationship(back_populates="document")
     signatures: List["Signature"] = Relationship(back_populates="document")
 
 class DocumentCreate(DocumentBase):
     pass
 
+class DocumentUpdate(SQLModel):
+    # Only the fields that were sent are applied; the file fields only together with a new file.
+    title: Optional[str] = None
+    description: Optional[str] = None
+    original_filename: Optional[str] = None
+    content_type: Optional[str] = None
+    upload_date: Optional[datetime] = None
+
 class DocumentRead(DocumentBase):
     id: int
     owner_id: int
+    version: int = 1
+    processing_status: Optional[str] = None
+    page_count: Optional[int] = None
+    has_preview: bool = False
+    updated_at: Optional[datetime] = None
     owner: Optional[UserRead] = None
 
+class DocumentVersionBase(SQLModel):
+    version: int
+    filename: str
+    original_filename: str
+    content_type: Optional[str] = None
+    sha256: Optional[str] = None
+    size: Optional[int] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class DocumentVersion(DocumentVersionBase, table=True):
+    """One row per uploaded file revision. Each holds its own blob reference, so past versions keep their bytes."""
+    __table_args__ = (
+        UniqueConstraint("document_id", "version", name="uq_documentversion_document_id_version"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    document_id: int = Field(foreign_key="document.id")
+
+    blob: Optional[Blob] = Relationship(sa_relationship_kwargs={
+        "primaryjoin": "foreign(DocumentVersion.filename) == Blob.sha256", "viewonly": True, "uselist": False,
+    })
+
+class DocumentVersionRead(DocumentVersionBase):
+    id: int
+    document_id: int
+
+class ProcessingJob(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    document_id: int = Field(foreign_key="document.id", index=True)
+    blob_key: str
+    status: str = Field(default="pending", index=True)
+    attempts: int = Field(default=0)
+    last_error: Optional[str] = None
+    run_after: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class ImportedFile(SQLModel, table=True):
+    """One row per archive file brought in by the bulk importer, written in the same transaction as its document.
+
+    No foreign key: the record outlives a later deletion, so re-running an import does not bring it back.
+    """
+    source: str = Field(primary_key=True)
+    document_id: int = Field(index=True)
+    imported_at: datetime = Field(default_factory=datetime.utcnow)
+
 class DocumentPermissionBase(SQLModel):
     can_view: bool = Field(default=True)
     can_sign: bool = Field(default=False)
     granted_at: datetime = Field(default_factory=datetime.utcnow)
 
 class DocumentPermission(DocumentPermissionBase, table=True):
+    # The unique constraint also serves as the (document_id, user_id) lookup index.
+    __table_args__ = (
+        UniqueConstraint("document_id", "user_id", name="uq_documentpermission_document_id_user_id"),
+        Index("ix_documentpermission_user_id_can_view", "user_id", "can_view"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     document_id: int = Field(foreign_key="document.id")
     user_id: int = Field(foreign_key="user.id")
@@ -68,15 +161,23 @@ class DocumentPermissionRead(DocumentPermissionBase):
     id: int
     document_id: int
     user_id: int
-    user: Optional[UserRead] = None
+    # Read from the row's user_obj relationship, when it is loaded.
+    user: Optional[UserRead] = Field(default=None, schema_extra={"validation_alias": "user_obj"})
 
 class SignatureBase(SQLModel):
     signed_at: datetime = Field(default_factory=datetime.utcnow)
     comments: Optional[str] = None
 
 class Signature(SignatureBase, table=True):
+    __table_args__ = (
+        UniqueConstraint("document_id", "version", "signer_id", name="uq_signature_document_id_version_signer_id"),
+        Index("ix_signature_signer_id", "signer_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     document_id: int = Field(foreign_key="document.id")
+    # The DocumentVersion that was signed; a new upload starts with no signatures.
+    version: int = Field(default=1)
     signer_id: int = Field(foreign_key="user.id")
 
     document: Document = Relationship(back_populates="signatures")
@@ -88,5 +189,6 @@ class SignatureCreate(SQLModel):
 class SignatureRead(SignatureBase):
     id: int
     document_id: int
+    version: int = 1
     signer_id: int
     signer: Optional[UserRead] = None
\ No newline at end of file
@@ -0,0 +1,244 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional
+import asyncio
+import logging
+import multiprocessing
+import uuid
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlmodel import Session, select
+from app import extraction, models, search, storage
+from app.config import settings
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def enqueue(session: Session, doc: models.Document) -> None:
+    """Queue processing for the document's current file; the job commits with the caller's transaction."""
+    session.add(models.ProcessingJob(document_id=doc.id, blob_key=doc.filename))
+    doc.processing_status = PENDING
+    doc.page_count = None
+    doc.has_preview = False
+
+
+class JobRunner:
+    """Claims persisted processing jobs and runs the CPU-heavy part in a process pool.
+
+    Claiming is a conditional UPDATE, so several application workers can share one queue.
+    """
+
+    def __init__(self):
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        # spawn: forking a process that already runs threads (uvicorn, the DB pool) is not safe.
+        self._pool = ProcessPoolExecutor(
+            max_workers=settings.PROCESSING_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        await run_in_threadpool(self._requeue_stale)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                jobs = await run_in_threadpool(self._claim, settings.PROCESSING_WORKERS)
+            except Exception:
+                logger.exception("Could not claim processing jobs")
+                jobs = []
+            if jobs:
+                await asyncio.gather(*(self._execute(job) for job in jobs))
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.PROCESSING_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, job: dict) -> None:
+        try:
+            try:
+                result = await self._analyze(job)
+            except Exception as e:
+                logger.warning("Processing job %s for document %s failed: %r", job["id"], job["document_id"], e)
+                await run_in_threadpool(self._fail, job, repr(e))
+                return
+            await run_in_threadpool(self._complete, job, result)
+        except Exception:
+            # Leave the job running; _requeue_stale picks it up after a restart.
+            logger.exception("Could not record the outcome of processing job %s", job["id"])
+
+    async def _analyze(self, job: dict) -> dict:
+        # Only the blocking file steps borrow a threadpool thread; waiting on the process pool does not,
+        # so slow jobs cannot use up the threads that request handlers need.
+        preview_path = settings.STAGING_DIR / f".{uuid.uuid4()}.preview.png"
+        original = storage.backend.materialize_original(job["blob_key"], job["encoding"])
+        try:
+            path = await run_in_threadpool(original.__enter__)
+            try:
+                future = self._pool.submit(
+                    extraction.analyze,
+                    str(path),
+                    job["original_filename"],
+                    str(preview_path),
+                    settings.MAX_EXTRACTED_TEXT_CHARS,
+                    settings.PREVIEW_SIZE,
+                )
+                result = await asyncio.wait_for(asyncio.wrap_future(future), settings.PROCESSING_TIMEOUT_SECONDS)
+            finally:
+                await run_in_threadpool(original.__exit__, None, None, None)
+            if result["has_preview"]:
+                await run_in_threadpool(storage.backend.put, storage.preview_key(job["blob_key"]), preview_path)
+            return result
+        finally:
+            preview_path.unlink(missing_ok=True)
+
+    def _requeue_stale(self) -> None:
+        # Jobs left running by a crashed worker go back to the queue.
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.PROCESSING_TIMEOUT_SECONDS * 2)
+        with Session(engine) as session:
+            session.execute(
+                update(models.ProcessingJob)
+                .where(models.ProcessingJob.status == RUNNING, models.ProcessingJob.updated_at < cutoff)
+                .values(status=PENDING)
+            )
+            session.commit()
+
+    def _claim(self, limit: int) -> List[dict]:
+        now = datetime.utcnow()
+        with Session(engine) as session:
+            candidates = session.exec(
+                select(models.ProcessingJob.id)
+                .where(models.ProcessingJob.status == PENDING, models.ProcessingJob.run_after <= now)
+                .order_by(models.ProcessingJob.id)
+                .limit(limit)
+            ).all()
+            claimed = []
+            for job_id in candidates:
+                result = session.execute(
+                    update(models.ProcessingJob)
+                    .where(models.ProcessingJob.id == job_id, models.ProcessingJob.status == PENDING)
+                    .values(status=RUNNING, attempts=models.ProcessingJob.attempts + 1, updated_at=now)
+                )
+                if result.rowcount:
+                    claimed.append(job_id)
+            session.commit()
+            if not claimed:
+                return []
+            rows = session.exec(
+                select(models.ProcessingJob, models.Document, models.Blob.encoding)
+                .join(models.Document, models.Document.id == models.ProcessingJob.document_id)
+                .outerjoin(models.Blob, models.Blob.sha256 == models.ProcessingJob.blob_key)
+                .where(models.ProcessingJob.id.in_(claimed))
+            ).all()
+            jobs, superseded = [], []
+            for job, doc, encoding in rows:
+                if doc.filename != job.blob_key:
+                    # The file was replaced before the job ran; the replacement has its own job.
+                    superseded.append(job.id)
+                    continue
+                jobs.append({
+                    "id": job.id,
+                    "document_id": job.document_id,
+                    "blob_key": job.blob_key,
+                    "encoding": encoding,
+                    "original_filename": doc.original_filename,
+                })
+            if superseded:
+                session.execute(
+                    update(models.ProcessingJob).where(models.ProcessingJob.id.in_(superseded)).values(status=DONE)
+                )
+            if jobs:
+                session.execute(
+                    update(models.Document)
+                    .where(models.Document.id.in_([job["document_id"] for job in jobs]))
+                    .values(processing_status=RUNNING)
+                )
+            session.commit()
+            return jobs
+
+    def _complete(self, job: dict, result: dict) -> None:
+        # Conditional UPDATEs rather than ORM flushes: the job or the document may have been deleted meanwhile.
+        with Session(engine) as session:
+            session.execute(
+                update(models.ProcessingJob)
+                .where(models.ProcessingJob.id == job["id"])
+                .values(status=DONE, last_error=None, updated_at=datetime.utcnow())
+            )
+            # Skip results for a file that has been replaced in the meantime; its own job will follow.
+            applied = session.execute(
+                update(models.Document)
+                .where(models.Document.id == job["document_id"], models.Document.filename == job["blob_key"])
+                .values(
+                    content_type=result["content_type"],
+                    page_count=result["page_count"],
+                    has_preview=result["has_preview"],
+                    processing_status=DONE,
+                )
+            ).rowcount
+            if applied:
+                session.execute(
+                    update(models.DocumentVersion)
+                    .where(
+                        models.DocumentVersion.document_id == job["document_id"],
+                        models.DocumentVersion.filename == job["blob_key"],
+                    )
+                    .values(content_type=result["content_type"])
+                )
+                doc = session.get(models.Document, job["document_id"])
+                search.index_document(session, doc, content=result["text"])
+            session.commit()
+
+    def _fail(self, job: dict, error: str) -> None:
+        with Session(engine) as session:
+            attempts = session.exec(
+                select(models.ProcessingJob.attempts).where(models.ProcessingJob.id == job["id"])
+            ).first()
+            if attempts is None:
+                return
+            now = datetime.utcnow()
+            if attempts >= settings.PROCESSING_MAX_ATTEMPTS:
+                values = {"status": FAILED}
+            else:
+                delay = settings.PROCESSING_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+                values = {"status": PENDING, "run_after": now + timedelta(seconds=delay)}
+            session.execute(
+                update(models.ProcessingJob)
+                .where(models.ProcessingJob.id == job["id"])
+                .values(last_error=error[:2000], updated_at=now, **values)
+            )
+            session.execute(
+                update(models.Document)
+                .where(models.Document.id == job["document_id"], models.Document.filename == job["blob_key"])
+                .values(processing_status=values["status"])
+            )
+            session.commit()
+
+
+runner = JobRunner()
@@ -0,0 +1,127 @@
+"""Removal of stored files whose last database reference is gone.
+
+Keys are attached to the session with `defer` and only queued once that transaction commits, so a
+rollback never leaves a row pointing at a deleted file. Each queued key has a blob row with no
+references left, a tombstone. A background thread deletes the tombstones and removes their files
+before committing, so the rows stay locked until the files are gone. An upload of the same content
+then either commits its reference first, and the tombstone is no longer deleted, or waits for the
+reclaimer and finds the file missing once it has committed, and stores it again.
+"""
+from typing import Iterable, List, Optional
+import logging
+import queue
+import threading
+from sqlalchemy import delete, event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session
+from app import metrics, models, storage
+from app.database import engine
+
+logger = logging.getLogger(__name__)
+
+_PENDING_KEY = "reclaim_blob_keys"
+
+
+class Reclaimer:
+    def __init__(self, batch_size: int = 100):
+        self.batch_size = batch_size
+        self.removed = 0
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def defer(self, session: OrmSession, keys: Iterable[str]) -> None:
+        """Remove `keys` from storage once `session` commits; forget them if it rolls back."""
+        session.info.setdefault(_PENDING_KEY, []).extend(keys)
+
+    def submit(self, keys: Iterable[str]) -> None:
+        keys = list(keys)
+        if not keys:
+            return
+        self._ensure_started()
+        for key in keys:
+            self._queue.put(key)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="blob-reclaimer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Finish the queued removals, then stop the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def join(self) -> None:
+        """Block until everything queued so far has been handled."""
+        self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            key = self._queue.get()
+            if key is None:
+                self._queue.task_done()
+                return
+            keys = [key]
+            stop = False
+            while len(keys) < self.batch_size:
+                try:
+                    key = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if key is None:
+                    stop = True
+                    break
+                keys.append(key)
+            try:
+                self._reclaim(keys)
+            except Exception:
+                # The files stay behind as orphans; nothing references them any more.
+                logger.exception("Could not reclaim %d stored file(s)", len(keys))
+            finally:
+                for _ in range(len(keys) + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def _reclaim(self, keys: List[str]) -> None:
+        with Session(engine) as session:
+            # Keys without a row were reclaimed already, and may be stored again by now.
+            tombstones = session.execute(
+                delete(models.Blob)
+                .where(models.Blob.sha256.in_(set(keys)), models.Blob.ref_count <= 0)
+                .returning(models.Blob.sha256)
+            ).scalars().all()
+            for key in tombstones:
+                storage.remove_blob(key)
+                self.removed += 1
+            session.commit()
+
+
+reclaimer = Reclaimer()
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _submit_deferred(session):
+    reclaimer.submit(session.info.pop(_PENDING_KEY, ()))
+
+
+@event.listens_for(OrmSession, "after_rollback")
+def _drop_deferred(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+metrics.registry.callback(
+    "blob_reclamation_pending", "Stored files queued for removal after their last reference was deleted.",
+    lambda: [((), reclaimer.pending)])
+metrics.registry.callback(
+    "blob_reclamation_removed_total", "Stored files removed by the reclaimer.",
+    lambda: [((), reclaimer.removed)], kind="counter")
@@ -1,14 +1,42 @@
-from typing import List, Annotated, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status
-from sqlmodel import Session
-from pathlib import Path
-import shutil
-import uuid
-from .. import crud, models, schemas, dependencies, auth
+from contextlib import asynccontextmanager, nullcontext
+from typing import AsyncIterator, List, Annotated, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File, Form, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from urllib.parse import quote
+from .. import archive, conditional, crud, models, schemas, serialization, dependencies, auth, processing, storage
+from app.config import settings
 import datetime
+import logging
 
-from app.config import settings
-UPLOAD_DIR = settings.UPLOAD_DIR
+logger = logging.getLogger(__name__)
+
+def content_disposition(filename: str) -> str:
+    return f"attachment; filename*=utf-8''{quote(filename)}"
+
+@asynccontextmanager
+async def _stored(db: dependencies.DB, staged: storage.StagedUpload) -> AsyncIterator[storage.StoredBlob]:
+    """Move `staged` into the blob store in the threadpool, keeping compression and S3 off the event loop.
+
+    If the block fails, a file stored here for the first time is released to the reclaimer. If the
+    content was stored already, the reclaimer may have removed it before the block committed its
+    reference, so it is checked afterwards and stored again if it is gone.
+    """
+    try:
+        created = await run_in_threadpool(storage.store_blob, staged)
+        blob = staged.stored()
+        try:
+            yield blob
+        except BaseException:
+            if created:
+                await db.run(crud.release_blobs, keys=[blob.key])
+            raise
+        if not created and not await run_in_threadpool(storage.blob_exists, blob):
+            await run_in_threadpool(storage.store_blob, staged)
+            if staged.stored() != blob:
+                await db.run(crud.update_blob_storage, blob=staged.stored())
+    finally:
+        staged.discard()
 
 router = APIRouter(
     prefix="/documents",
@@ -16,43 +44,103 @@ router = APIRouter(
     dependencies=[Depends(auth.get_current_active_user)]
 )
 
+async def _file_response(request: Request, file: Union[models.Document, models.DocumentVersion]) -> Response:
+    """Stream a document's or version's stored file, honouring conditional and range headers.
+
+    Compressed blobs go out as stored when the client accepts their encoding and asked for the
+    whole file; otherwise they are decompressed on the fly.
+    """
+    modified = file.upload_date if isinstance(file, models.Document) else file.created_at
+    encoding = file.blob.encoding if file.blob else None
+    stored_key = storage.stored_key(file.filename, encoding)
+    pass_through = encoding is not None and "range" not in request.headers and conditional.accepts_encoding(request, encoding)
+    # Blob keys are content hashes (or unique legacy names), so either one identifies these exact bytes.
+    etag = conditional.make_etag(file.sha256 or file.filename)
+    if pass_through:
+        etag = conditional.make_etag(f"{file.sha256 or file.filename}-{encoding}")
+    headers = {
+        "ETag": etag,
+        "Last-Modified": conditional.http_date(modified),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+    }
+    if encoding is not None:
+        headers["Vary"] = "Accept-Encoding"
+    if conditional.is_not_modified(request, etag, modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    if not await run_in_threadpool(storage.backend.exists, stored_key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found on server.")
+    size = file.size if file.size is not None else await run_in_threadpool(storage.backend.size, stored_key)
+
+    headers["Content-Disposition"] = content_disposition(file.original_filename)
+    media_type = file.content_type or 'application/octet-stream'
+    if pass_through:
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(file.blob.stored_size)
+        return StreamingResponse(
+            storage.backend.iter_chunks(stored_key, settings.UPLOAD_CHUNK_SIZE),
+            media_type=media_type,
+            headers=headers
+        )
+
+    byte_range = None
+    if conditional.if_range_allows(request, etag, modified):
+        try:
+            byte_range = conditional.parse_range(request.headers.get("range"), size)
+        except conditional.RangeNotSatisfiable:
+            return Response(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={**headers, "Content-Range": f"bytes */{size}"}
+            )
+
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            storage.backend.iter_original(file.filename, encoding, settings.UPLOAD_CHUNK_SIZE),
+            media_type=media_type,
+            headers=headers
+        )
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        storage.backend.iter_original_range(file.filename, encoding, start, end, settings.UPLOAD_CHUNK_SIZE),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=headers
+    )
+
+
 @router.post("/addDocument/", response_model=schemas.DocumentUploadResponse, status_code=status.HTTP_201_CREATED)
 async def upload_document(
     title: Annotated[str, Form()],
     description: Annotated[Optional[str], Form()] = None,
     file: UploadFile = File(...),
     current_user: models.User = Depends(auth.get_current_active_user),
-    session: Session = Depends(dependencies.get_session)
+    db: dependencies.DB = Depends(dependencies.get_db)
 ):
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided or filename is missing.")
 
-    file_extension = Path(file.filename).suffix
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = UPLOAD_DIR / unique_filename
-
-    try:
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Could not save file: {e}")
-    finally:
-        if file:
-             file.file.close()
-
+    staged = await storage.stage_upload(file)
     doc_in = models.DocumentCreate(
         title=title,
         description=description,
-        filename=unique_filename,
+        filename=staged.key,
         original_filename=file.filename,
         content_type=file.content_type,
+        sha256=staged.sha256,
+        size=staged.size,
     )
-    db_document = crud.create_document(session=session, doc_in=doc_in, owner_id=current_user.id, file_path=file_path)
-    session.refresh(db_document, attribute_names=["owner"])
+    async with _stored(db, staged) as blob:
+        db_document = await db.run(crud.create_document, doc_in=doc_in, owner_id=current_user.id, blob=blob)
+    processing.runner.notify()
 
     try:
-        crud.grant_permission(
-            session=session,
+        await db.run(
+            crud.grant_permission,
             document_id=db_document.id,
             owner_id=current_user.id,
             user_id_to_grant=current_user.id,
@@ -60,78 +148,183 @@ async def upload_document(
             can_sign=True
         )
     except HTTPException as e:
-        print(f"Warning: Could not grant sign permission to owner on upload: {e.detail}")
+        logger.warning("Could not grant sign permission to owner on upload: %s", e.detail)
 
-    doc_read = schemas.DocumentRead.model_validate(db_document)
-    return schemas.DocumentUploadResponse(
-        message="Document uploaded successfully",
-        document=doc_read
+    return serialization.DOCUMENT_UPLOAD.response(
+        {"message": "Document uploaded successfully", "document": db_document},
+        status_code=status.HTTP_201_CREATED
     )
 
 
 @router.get("/getDocuments/", response_model=schemas.DocumentListResponse)
-def read_documents_for_user(
+async def read_documents_for_user(
+    request: Request,
+    limit: Annotated[int, Query(ge=1, le=1000)] = 100,
+    cursor: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    shared_with_me: bool = False,
+    content_type: Optional[str] = None,
+    uploaded_after: Optional[datetime.datetime] = None,
+    uploaded_before: Optional[datetime.datetime] = None,
     current_user: models.User = Depends(auth.get_current_active_user),
-    session: Session = Depends(dependencies.get_session)
+    db: dependencies.DB = Depends(dependencies.get_read_db)
 ):
-    documents = crud.get_documents_for_user(session=session, user_id=current_user.id)
-    docs_read_list = []
-    for doc_model in documents:
-        session.refresh(doc_model, attribute_names=["owner"])
-        docs_read_list.append(schemas.DocumentRead.model_validate(doc_model))
-    return schemas.DocumentListResponse(documents=docs_read_list)
+    documents, next_cursor = await db.run(
+        crud.get_documents_for_user,
+        user_id=current_user.id,
+        limit=limit,
+        cursor=cursor,
+        owner_id=owner_id,
+        shared_with_me=shared_with_me,
+        content_type=content_type,
+        uploaded_after=uploaded_after,
+        uploaded_before=uploaded_before,
+    )
+    # Documents leaving the list (deleted, access revoked) do not move the newest updated_at, so a 304 needs the ETag.
+    return conditional.conditional_json(
+        request,
+        serialization.DOCUMENT_LIST.render({"documents": documents, "next_cursor": next_cursor}),
+        last_modified=max((doc.updated_at for doc in documents), default=None),
+        trust_last_modified=False,
+    )
+
+
+@router.get("/search/", response_model=schemas.DocumentSearchResponse)
+async def search_documents(
+    q: Annotated[str, Query(min_length=1, max_length=256)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: dependencies.DB = Depends(dependencies.get_read_db)
+):
+    documents, has_more = await db.run(
+        crud.search_documents_for_user,
+        user_id=current_user.id,
+        query=q,
+        limit=limit,
+        offset=offset,
+    )
+    return serialization.DOCUMENT_SEARCH.response(
+        {"documents": documents, "next_offset": offset + limit if has_more else None}
+    )
 
 
 @router.get("/getDocument/{document_id}/", response_model=schemas.DocumentDetailResponse)
-def read_document_details(
+async def read_document_details(
+    request: Request,
     document_id: int,
     current_user: models.User = Depends(auth.get_current_active_user),
-    session: Session = Depends(dependencies.get_session)
+    db: dependencies.DB = Depends(dependencies.get_read_db)
 ):
-    db_doc = crud.get_document_with_details(session=session, document_id=document_id, user_id=current_user.id)
+    db_doc = await db.run(crud.get_document_with_details, document_id=document_id, user_id=current_user.id)
     if db_doc is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found or access denied.")
-    return schemas.DocumentDetailResponse.model_validate(db_doc)
+    return conditional.conditional_json(
+        request, serialization.DOCUMENT_DETAIL.render(db_doc), last_modified=db_doc.updated_at
+    )
 
 
 @router.get("/downloadDocument/{document_id}/")
 async def download_document(
+    request: Request,
     document_id: int,
     current_user: models.User = Depends(auth.get_current_active_user),
-    session: Session = Depends(dependencies.get_session)
+    db: dependencies.DB = Depends(dependencies.get_read_db)
 ):
-    db_doc = crud.get_document_for_download(session=session, document_id=document_id, user_id=current_user.id)
+    db_doc = await db.run(crud.get_document_for_download, document_id=document_id, user_id=current_user.id)
     if db_doc is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found or access denied.")
 
-    file_path = UPLOAD_DIR / db_doc.filename
-    if not file_path.exists():
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found on server.")
+    return await _file_response(request, db_doc)
+
+
+@router.get("/getVersions/{document_id}/", response_model=List[models.DocumentVersionRead])
+async def list_document_versions(
+    document_id: int,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: dependencies.DB = Depends(dependencies.get_read_db)
+):
+    versions = await db.run(crud.get_document_versions, document_id=document_id, user_id=current_user.id)
+    if versions is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found or access denied.")
+    return serialization.DOCUMENT_VERSIONS.response(versions)
+
 
-    from fastapi.responses import FileResponse
-    return FileResponse(
-        path=file_path,
-        filename=db_doc.original_filename,
-        media_type=db_doc.content_type or 'application/octet-stream'
+@router.get("/downloadVersion/{document_id}/{version}/")
+async def download_document_version(
+    request: Request,
+    document_id: int,
+    version: int,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: dependencies.DB = Depends(dependencies.get_read_db)
+):
+    db_version = await db.run(crud.get_document_version, document_id=document_id, version=version, user_id=current_user.id)
+    if db_version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Version not found or access denied.")
+    return await _file_response(request, db_version)
+
+
+@router.get("/getPreview/{document_id}/")
+async def get_document_preview(
+    request: Request,
+    document_id: int,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: dependencies.DB = Depends(dependencies.get_read_db)
+):
+    db_doc = await db.run(crud.get_document, document_id=document_id, user_id=current_user.id)
+    if db_doc is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found or access denied.")
+    if not db_doc.has_preview:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No preview available for this document.")
+
+    etag = conditional.make_etag(f"{db_doc.sha256 or db_doc.filename}-preview")
+    # updated_at moves when processing stores a preview, which can be well after the upload.
+    headers = {"ETag": etag, "Last-Modified": conditional.http_date(db_doc.updated_at), "Cache-Control": "private, no-cache"}
+    if conditional.is_not_modified(request, etag, db_doc.updated_at):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    key = storage.preview_key(db_doc.filename)
+    if not await run_in_threadpool(storage.backend.exists, key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No preview available for this document.")
+    return StreamingResponse(storage.backend.iter_chunks(key, settings.UPLOAD_CHUNK_SIZE), media_type="image/png", headers=headers)
+
+
+@router.get("/downloadDocuments/")
+async def download_documents_archive(
+    document_ids: Annotated[List[int], Query(min_length=1, max_length=settings.MAX_ARCHIVE_DOCUMENTS)],
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: dependencies.DB = Depends(dependencies.get_read_db)
+):
+    documents = await db.run(crud.get_documents_by_ids, document_ids=document_ids, user_id=current_user.id)
+    missing = sorted(set(document_ids) - {doc.id for doc in documents})
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Documents not found or access denied: {missing}"
+        )
+
+    return StreamingResponse(
+        archive.iter_zip(documents, storage.backend, settings.UPLOAD_CHUNK_SIZE),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition("documents.zip")}
     )
 
 
 @router.post("/addUser/{document_id}/", response_model=schemas.DocumentPermissionRead)
-def share_document(
+async def share_document(
     document_id: int,
     share_request: schemas.ShareDocumentRequest,
     current_user: models.User = Depends(auth.get_current_active_user),
-    session: Session = Depends(dependencies.get_session)
+    db: dependencies.DB = Depends(dependencies.get_db)
 ):
-    target_user = crud.get_user_by_email(session=session, email=share_request.email)
+    target_user = await db.run(crud.get_user_by_email, email=share_request.email)
     if not target_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User with this email not found"
         )
 
-    permission = crud.grant_permission(
-        session=session,
+    permission = await db.run(
+        crud.grant_permission,
         document_id=document_id,
         owner_id=current_user.id,
         user_id_to_grant=target_user.id,
@@ -144,22 +337,39 @@ def share_document(
             detail="Could not grant permission. User may not be owner or document not found."
         )
 
-    session.refresh(permission, attribute_names=["user_obj"])
-    if permission.user_obj:
-         session.refresh(permission.user_obj)
+    return serialization.PERMISSION.response(permission)
 
-    return schemas.DocumentPermissionRead.model_validate(permission)
+
+@router.post("/addUsers/{document_id}/", response_model=schemas.BulkShareResponse)
+async def share_document_bulk(
+    document_id: int,
+    share_request: schemas.BulkShareRequest,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: dependencies.DB = Depends(dependencies.get_db)
+):
+    results = await db.run(
+        crud.grant_permissions_bulk,
+        document_id=document_id,
+        owner_id=current_user.id,
+        shares=share_request.shares
+    )
+    if results is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not grant permission. User may not be owner or document not found."
+        )
+    return serialization.BULK_SHARE.response({"results": results})
 
 
 @router.post("/signDocument/{document_id}/", response_model=schemas.SignatureRead)
-def sign_document(
+async def sign_document(
     document_id: int,
     signature_in: models.SignatureCreate,
     current_user: models.User = Depends(auth.get_current_active_user),
-    session: Session = Depends(dependencies.get_session)
+    db: dependencies.DB = Depends(dependencies.get_db)
 ):
-    signature = crud.create_signature(
-        session=session,
+    signature = await db.run(
+        crud.create_signature,
         document_id=document_id,
         signer_id=current_user.id,
         signature_in=signature_in
@@ -167,26 +377,22 @@ def sign_document(
     if signature is None:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create signature.")
 
-    session.refresh(signature, attribute_names=["signer"])
-    if signature.signer:
-        session.refresh(signature.signer)
-
-    return schemas.SignatureRead.model_validate(signature)
+    return serialization.SIGNATURE.response(signature)
 
 @router.delete("/deleteDocument/{document_id}/", status_code=status.HTTP_204_NO_CONTENT)
-def delete_document(
+async def delete_document(
     document_id: int,
     current_user: models.User = Depends(auth.get_current_active_user),
-    session: Session = Depends(dependencies.get_session)
+    db: dependencies.DB = Depends(dependencies.get_db)
 ):
-    doc_to_delete = crud.get_document(session=session, document_id=document_id, user_id=current_user.id)
+    doc_to_delete = await db.run(crud.get_document, document_id=document_id, user_id=current_user.id)
     if not doc_to_delete or doc_to_delete.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to delete this document or document not found."
         )
 
-    success = crud.delete_document(session=session, document_id=document_id, owner_id=current_user.id)
+    success = await db.run(crud.delete_document, document_id=document_id, owner_id=current_user.id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -194,6 +400,20 @@ def delete_document(
         )
     return {}
 
+@router.post("/deleteDocuments/", response_model=schemas.BulkDeleteResponse)
+async def delete_documents(
+    delete_request: schemas.BulkDeleteRequest,
+    current_user: models.User = Depends(auth.get_current_active_user),
+    db: dependencies.DB = Depends(dependencies.get_db)
+):
+    requested = list(dict.fromkeys(delete_request.document_ids))
+    deleted = await db.run(crud.delete_documents, document_ids=requested, owner_id=current_user.id)
+    deleted_set = set(deleted)
+    return serialization.BULK_DELETE.response({
+        "deleted": [document_id for document_id in requested if document_id in deleted_set],
+        "not_deleted": [document_id for document_id in requested if document_id not in deleted_set],
+    })
+
 @router.put("/replaceDocument/{document_id}/", response_model=schemas.DocumentRead)
 async def update_document(
     document_id: int,
@@ -201,79 +421,62 @@ async def update_document(
     description: Annotated[Optional[str], Form()] = None,
     file: Optional[UploadFile] = File(None),
     current_user: models.User = Depends(auth.get_current_active_user),
-    session: Session = Depends(dependencies.get_session)
+    db: dependencies.DB = Depends(dependencies.get_db)
 ):
-    db_doc = crud.get_document(session=session, document_id=document_id, user_id=current_user.id)
+    db_doc = await db.run(crud.get_document, document_id=document_id, user_id=current_user.id)
     if not db_doc or db_doc.owner_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to update this document or document not found."
         )
 
-    new_file_path = None
+    staged = None
     if file:
         if not file.filename:
             raise HTTPException(status_code=400, detail="No file provided for update or filename is missing.")
-
-        file_extension = Path(file.filename).suffix
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
-        new_file_path = UPLOAD_DIR / unique_filename
-
-        try:
-            with new_file_path.open("wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Could not save new file: {e}")
-        finally:
-            if file:
-                file.file.close()
-
-    doc_update_data = {
-        "title": title if title is not None else db_doc.title,
-        "description": description if description is not None else db_doc.description,
-    }
-
-    if new_file_path:
-        doc_update_data["filename"] = new_file_path.name
+        staged = await storage.stage_upload(file)
+
+    doc_update_data = {}
+    if title is not None:
+        doc_update_data["title"] = title
+    if description is not None:
+        doc_update_data["description"] = description
+    if staged:
         doc_update_data["original_filename"] = file.filename
         doc_update_data["content_type"] = file.content_type
         doc_update_data["upload_date"] = datetime.datetime.utcnow()
-    else:
-        doc_update_data["filename"] = db_doc.filename
-        doc_update_data["original_filename"] = db_doc.original_filename
-        doc_update_data["content_type"] = db_doc.content_type
-        doc_update_data["upload_date"] = db_doc.upload_date
-
-
-    doc_update_model = models.DocumentCreate(**doc_update_data)
 
+    doc_update_model = models.DocumentUpdate(**doc_update_data)
 
-    updated_doc = crud.update_document(
-        session=session,
-        document_id=document_id,
-        owner_id=current_user.id,
-        doc_update=doc_update_model,
-        new_file_path=new_file_path
-    )
-    if updated_doc is None:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update document.")
+    async with (_stored(db, staged) if staged else nullcontext()) as blob:
+        updated_doc = await db.run(
+            crud.update_document,
+            document_id=document_id,
+            owner_id=current_user.id,
+            doc_update=doc_update_model,
+            new_blob=blob
+        )
+        if updated_doc is None:
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to update document.")
+    if staged:
+        processing.runner.notify()
 
-    return schemas.DocumentRead.model_validate(updated_doc)
+    return serialization.DOCUMENT.response(updated_doc)
 
 @router.get("/getUsers/{document_id}/",
             response_model=List[schemas.UserDocumentAccess],
             summary="get a list of users with access to a document")
-def get_document_access_list(
+async def get_document_access_list(
     document_id: int,
     current_user: models.User = Depends(auth.get_current_active_user),
-    session: Session = Depends(dependencies.get_session)
+    db: dependencies.DB = Depends(dependencies.get_read_db)
 ):
-    document_check = crud.get_document(session=session, document_id=document_id, user_id=current_user.id) #
+    document_check = await db.run(crud.get_document, document_id=document_id, user_id=current_user.id) #
     if not document_check:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Документ не найден или у вас нет к нему доступа."
         )
-    access_list = crud.get_users_with_document_access(session=session, document_id=document_id)
+    access_list = await db.run(crud.get_users_with_document_access, document_id=document_id)
 
-    return access_list
+    return serialization.DOCUMENT_ACCESS.response(access_list)
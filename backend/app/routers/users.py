@@ -1,9 +1,8 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session
 from datetime import timedelta
-from app import crud, models, schemas, auth, dependencies
+from app import crud, models, schemas, serialization, auth, dependencies
 from app.config import settings
 import logging
 
@@ -15,19 +14,20 @@ router = APIRouter(
 )
 
 @router.post("/register/", response_model=schemas.TokenWithUser, status_code=status.HTTP_201_CREATED)
-def register_user(
+async def register_user(
     user_in: models.UserCreate,
-    session: Session = Depends(dependencies.get_session)
+    db: dependencies.DB = Depends(dependencies.get_db)
 ):
     logger.info(f"Received POST /register for email: {user_in.email}")
-    db_user = crud.get_user_by_email(session, email=user_in.email)
+    db_user = await db.run(crud.get_user_by_email, email=user_in.email)
     if db_user:
         logger.warning(f"Registration failed: email already registered ({user_in.email})")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    created_user = crud.create_user(session=session, user_in=user_in)
+    hashed_password = await auth.password_hasher.hash(user_in.password)
+    created_user = await db.run(crud.create_user, user_in=user_in, hashed_password=hashed_password)
 
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = auth.create_access_token(
@@ -35,19 +35,18 @@ def register_user(
     )
     logger.info(f"User registered successfully: {created_user.email}")
 
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user": models.UserRead.model_validate(created_user)
-    }
+    return serialization.TOKEN_WITH_USER.response(
+        {"access_token": access_token, "token_type": "bearer", "user": created_user},
+        status_code=status.HTTP_201_CREATED
+    )
 
 @router.post("/login/", response_model=schemas.Token)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    session: Session = Depends(dependencies.get_session)
+    db: dependencies.DB = Depends(dependencies.get_db)
 ):
     logger.info(f"Received POST /login")
-    user = crud.authenticate_user(session, email=form_data.username, password=form_data.password)
+    user = await auth.authenticate_user(db, email=form_data.username, password=form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -71,15 +70,26 @@ async def login_for_access_token(
 async def read_users_me(
     current_user: Annotated[models.User, Depends(auth.get_current_active_user)]
 ):
-    return models.UserRead.model_validate(current_user)
+    return serialization.USER.response(current_user)
+
+@router.post("/me/deactivate/", response_model=models.UserRead)
+async def deactivate_current_user(
+    current_user: Annotated[models.User, Depends(auth.get_current_active_user)],
+    db: dependencies.DB = Depends(dependencies.get_db),
+):
+    # update_user drops the cached principal on every worker, so the token stops working right away.
+    user = await db.run(crud.deactivate_user, user_id=current_user.id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    return serialization.USER.response(user)
 
 @router.get("/{user_id}/", response_model=models.UserRead)
-def read_user_info(
+async def read_user_info(
     user_id: int,
     current_user: Annotated[models.User, Depends(auth.get_current_active_user)],
-    session: Session = Depends(dependencies.get_session),
+    db: dependencies.DB = Depends(dependencies.get_read_db),
 ):
-    user = crud.get_user(session=session, user_id=user_id)
+    user = await db.run(crud.get_user, user_id=user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
-    return models.UserRead.model_validate(user)
\ No newline at end of file
+    return serialization.USER.response(user)
\ No newline at end of file
@@ -1,6 +1,7 @@
 from typing import Optional, List
 from sqlmodel import SQLModel
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from app.config import settings
 from app.models import UserRead, DocumentRead, DocumentPermissionRead, SignatureRead
 
 class Token(BaseModel):
@@ -19,8 +20,33 @@ class ShareDocumentRequest(SQLModel):
     can_view: bool = True
     can_sign: bool = False
 
+class BulkShareRequest(SQLModel):
+    shares: List[ShareDocumentRequest] = Field(max_length=settings.MAX_BATCH_SHARE_USERS)
+
+class BulkShareResult(SQLModel):
+    email: str
+    granted: bool
+    detail: Optional[str] = None
+    permission: Optional[DocumentPermissionRead] = None
+
+class BulkShareResponse(SQLModel):
+    results: List[BulkShareResult]
+
+class BulkDeleteRequest(BaseModel):
+    document_ids: List[int] = Field(min_length=1, max_length=settings.MAX_BATCH_DELETE_DOCUMENTS)
+
+class BulkDeleteResponse(BaseModel):
+    deleted: List[int]
+    # Not found, or not owned by the caller.
+    not_deleted: List[int]
+
 class DocumentListResponse(SQLModel):
     documents: List[DocumentRead]
+    next_cursor: Optional[str] = None
+
+class DocumentSearchResponse(SQLModel):
+    documents: List[DocumentRead]
+    next_offset: Optional[int] = None
 
 class DocumentDetailResponse(DocumentRead):
     permissions: List[DocumentPermissionRead] = []
@@ -0,0 +1,89 @@
+from typing import List, Optional, Tuple
+import re
+from sqlalchemy import column, delete, func, table, text
+from sqlalchemy.orm import joinedload
+from sqlmodel import Session, select
+from app import models
+
+# Search indexes are maintained by hand-written migrations, not by SQLModel metadata.
+# SQLite's FTS5 also creates shadow tables named document_fts_*.
+UNMANAGED_TABLE_PREFIXES = ("document_fts", "documentsearch")
+
+_fts = table("document_fts", column("rowid"), column("title"), column("description"), column("content"))
+_pg_search = table("documentsearch", column("document_id"), column("content"), column("tsv"))
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _dialect(session: Session) -> str:
+    return session.get_bind().dialect.name
+
+
+def _fts5_query(query: str) -> Optional[str]:
+    # Quote every token so user input can never be parsed as FTS5 syntax; `*` keeps prefix matches working.
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _stored_content(session: Session, document_id: int) -> str:
+    if _dialect(session) == "postgresql":
+        statement = select(_pg_search.c.content).where(_pg_search.c.document_id == document_id)
+    else:
+        statement = select(_fts.c.content).where(_fts.c.rowid == document_id)
+    return session.exec(statement).first() or ""
+
+
+def index_document(session: Session, doc: models.Document, content: Optional[str] = None) -> None:
+    """Insert or refresh the index entry for `doc` within the caller's transaction.
+
+    `content` is the extracted text; None keeps whatever text was indexed before.
+    """
+    if content is None:
+        content = _stored_content(session, doc.id)
+    params = {"id": doc.id, "title": doc.title, "description": doc.description or "", "content": content}
+    if _dialect(session) == "postgresql":
+        session.execute(text(
+            "INSERT INTO documentsearch (document_id, content, tsv) VALUES (:id, :content, "
+            "setweight(to_tsvector('simple', :title), 'A') || "
+            "setweight(to_tsvector('simple', :description), 'B') || "
+            "setweight(to_tsvector('simple', :content), 'C')) "
+            "ON CONFLICT (document_id) DO UPDATE SET content = excluded.content, tsv = excluded.tsv"
+        ), params)
+    else:
+        session.execute(text("DELETE FROM document_fts WHERE rowid = :id"), params)
+        session.execute(text(
+            "INSERT INTO document_fts (rowid, title, description, content) VALUES (:id, :title, :description, :content)"
+        ), params)
+
+
+def remove_documents(session: Session, document_ids: List[int]) -> None:
+    if _dialect(session) == "postgresql":
+        session.execute(delete(_pg_search).where(_pg_search.c.document_id.in_(document_ids)))
+    else:
+        session.execute(delete(_fts).where(_fts.c.rowid.in_(document_ids)))
+
+
+def search_documents(session: Session, query: str, viewable, limit: int, offset: int) -> Tuple[List[models.Document], bool]:
+    """Best matches first among documents satisfying `viewable`; returns the page and whether more follow."""
+    statement = select(models.Document).where(viewable).options(joinedload(models.Document.owner))
+    if _dialect(session) == "postgresql":
+        ts_query = func.websearch_to_tsquery("simple", query)
+        statement = (
+            statement.join(_pg_search, _pg_search.c.document_id == models.Document.id)
+            .where(_pg_search.c.tsv.op("@@")(ts_query))
+            .order_by(func.ts_rank(_pg_search.c.tsv, ts_query).desc(), models.Document.id.desc())
+        )
+    else:
+        match = _fts5_query(query)
+        if match is None:
+            return [], False
+        statement = (
+            statement.join(_fts, _fts.c.rowid == models.Document.id)
+            .where(text("document_fts MATCH :match").bindparams(match=match))
+            # Column weights: title, description, content.
+            .order_by(text("bm25(document_fts, 10.0, 5.0, 1.0)"), models.Document.id.desc())
+        )
+    documents = list(session.exec(statement.limit(limit + 1).offset(offset)).all())
+    return documents[:limit], len(documents) > limit
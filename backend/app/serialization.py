@@ -0,0 +1,154 @@
+"""JSON response bodies written straight from ORM rows, in one pass.
+
+A handler that returns a model makes FastAPI validate it against `response_model` a second time and
+serialize it through `jsonable_encoder`, which for a page of documents costs more than the query.
+A `Serializer` instead reads the fields of its response model off the rows with a reader built once
+per model, and encodes the result with orjson when it is installed. Routes keep `response_model` for
+the OpenAPI schema and return the finished `Response`.
+
+The rows come from our own typed columns, so they are not validated again on the way out; only the
+fields the response model declares are read, which keeps private columns out of the body as before.
+A field with a `validation_alias` is read from that attribute of an ORM row, and only when it is
+already loaded: the session is gone by the time a body is rendered, so nothing may be lazy loaded.
+"""
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Callable, Dict, List, Mapping, Optional, Type, Union, get_args, get_origin
+from uuid import UUID
+import json
+from fastapi import Response, status
+from pydantic import BaseModel
+from app import models, schemas
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_MISSING = object()
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (UUID, Decimal)):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_default)
+    return json.dumps(value, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _is_orm_row(value: Any) -> bool:
+    return hasattr(value, "_sa_instance_state")
+
+
+def _converter(annotation: Any) -> Optional[Callable[[Any], Any]]:
+    """How to turn a value of `annotation` into plain data, or None when it can be encoded as is."""
+    origin = get_origin(annotation)
+    if origin is Union:
+        options = [option for option in get_args(annotation) if option is not type(None)]
+        inner = _converter(options[0]) if len(options) == 1 else None
+        return None if inner is None else (lambda value: None if value is None else inner(value))
+    if origin in (list, tuple, set, frozenset):
+        args = get_args(annotation)
+        inner = _converter(args[0]) if args else None
+        return None if inner is None else (lambda values: [inner(value) for value in values])
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return model_reader(annotation)
+    return None
+
+
+@lru_cache(maxsize=None)
+def model_reader(model: Type[BaseModel]) -> Callable[[Any], Dict[str, Any]]:
+    """A function reading `model`'s fields off an ORM row, a model instance or a mapping."""
+    names = tuple(model.model_fields)
+    sources = tuple(
+        field.validation_alias if isinstance(field.validation_alias, str) else name
+        for name, field in model.model_fields.items()
+    )
+    aliased = {source for name, source in zip(names, sources) if source != name}
+    fields = [
+        (name, source, field, _converter(field.annotation))
+        for (name, field), source in zip(model.model_fields.items(), sources)
+    ]
+    converted = [(name, convert) for name, _, _, convert in fields if convert is not None]
+
+    def getter(keys):
+        return itemgetter(*keys) if len(keys) > 1 else (lambda values: (values[keys[0]],))
+
+    get_by_name, get_by_source = getter(names), getter(sources)
+
+    def read_slow(row: Any) -> Dict[str, Any]:
+        is_orm_row = _is_orm_row(row)
+        data = {}
+        for name, source, field, convert in fields:
+            if isinstance(row, Mapping):
+                value = row.get(name, _MISSING)
+            elif not is_orm_row:
+                value = getattr(row, name, _MISSING)
+            elif source in aliased:
+                value = vars(row).get(source, _MISSING)
+            else:
+                value = getattr(row, source, _MISSING)
+            if value is _MISSING:
+                value = field.get_default(call_default_factory=True)
+            elif convert is not None and value is not None:
+                value = convert(value)
+            data[name] = value
+        return data
+
+    def read(row: Any) -> Dict[str, Any]:
+        if isinstance(row, Mapping):
+            return read_slow(row)
+        try:
+            # Loaded columns and relationships of an ORM row (and the fields of a model instance) live in
+            # its __dict__; reading them there skips the attribute instrumentation.
+            get_all = get_by_source if _is_orm_row(row) else get_by_name
+            data = dict(zip(names, get_all(row.__dict__)))
+        except (AttributeError, KeyError):
+            # Expired or unloaded attributes, such as a permission whose user_obj was not loaded.
+            return read_slow(row)
+        for name, convert in converted:
+            value = data[name]
+            if value is not None:
+                data[name] = convert(value)
+        return data
+
+    return read
+
+
+class Serializer:
+    def __init__(self, annotation: Any):
+        self.read = _converter(annotation) or (lambda value: value)
+
+    def render(self, source: Any) -> bytes:
+        return dumps(self.read(source))
+
+    def response(self, source: Any, status_code: int = status.HTTP_200_OK) -> Response:
+        return Response(content=self.render(source), status_code=status_code, media_type="application/json")
+
+
+DOCUMENT = Serializer(models.DocumentRead)
+DOCUMENT_UPLOAD = Serializer(schemas.DocumentUploadResponse)
+DOCUMENT_LIST = Serializer(schemas.DocumentListResponse)
+DOCUMENT_SEARCH = Serializer(schemas.DocumentSearchResponse)
+DOCUMENT_DETAIL = Serializer(schemas.DocumentDetailResponse)
+DOCUMENT_VERSIONS = Serializer(List[models.DocumentVersionRead])
+PERMISSION = Serializer(schemas.DocumentPermissionRead)
+BULK_SHARE = Serializer(schemas.BulkShareResponse)
+BULK_DELETE = Serializer(schemas.BulkDeleteResponse)
+SIGNATURE = Serializer(schemas.SignatureRead)
+DOCUMENT_ACCESS = Serializer(List[schemas.UserDocumentAccess])
+USER = Serializer(models.UserRead)
+TOKEN_WITH_USER = Serializer(schemas.TokenWithUser)
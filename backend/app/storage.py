@@ -0,0 +1,358 @@
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional
+import hashlib
+import mimetypes
+import os
+import shutil
+import uuid
+from fastapi import HTTPException, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from app import compression
+from app.config import settings
+
+
+class StoredBlob(NamedTuple):
+    """A file already in the blob store, as recorded in the blob table."""
+    key: str
+    size: int
+    encoding: Optional[str]
+    stored_size: int
+
+
+class StagedUpload:
+    """An upload written to a temporary file, waiting to be linked into the blob store."""
+
+    def __init__(self, temp_path: Path, sha256: str, size: int, content_type: Optional[str] = None):
+        self.temp_path = temp_path
+        self.sha256 = sha256
+        self.size = size
+        self.content_type = content_type
+        # How the blob ended up stored; filled in by store_blob.
+        self.encoding: Optional[str] = None
+        self.stored_size = size
+
+    @property
+    def key(self) -> str:
+        return self.sha256
+
+    def stored(self) -> StoredBlob:
+        """The blob this upload became; call after store_blob."""
+        return StoredBlob(self.key, self.size, self.encoding, self.stored_size)
+
+    def discard(self) -> None:
+        self.temp_path.unlink(missing_ok=True)
+
+
+class StorageBackend(ABC):
+    """Where blob bytes live; keys are opaque strings (content hashes for new uploads)."""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool: ...
+
+    @abstractmethod
+    def put(self, key: str, source: Path) -> bool:
+        """Move the local file `source` in under `key`; returns False, leaving `source` alone, if the key was already stored."""
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO: ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    def size(self, key: str) -> int: ...
+
+    @abstractmethod
+    def keys(self) -> Iterator[str]: ...
+
+    @contextmanager
+    def materialize(self, key: str) -> Iterator[Path]:
+        """A local file holding `key` for the duration of the block (downloaded to a temp file if needed)."""
+        settings.STAGING_DIR.mkdir(parents=True, exist_ok=True)
+        temp_path = settings.STAGING_DIR / f".{uuid.uuid4()}.part"
+        try:
+            with self.open(key) as source, temp_path.open("wb") as target:
+                shutil.copyfileobj(source, target, settings.UPLOAD_CHUNK_SIZE)
+            yield temp_path
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+    def iter_chunks(self, key: str, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        with self.open(key) as stream:
+            while chunk := stream.read(chunk_size):
+                yield chunk
+
+    def iter_range(self, key: str, start: int, end: int, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """Yield bytes `start`..`end` (inclusive) of `key`."""
+        with self.open(key) as stream:
+            stream.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = stream.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+    def iter_original(self, key: str, encoding: Optional[str], chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        """The original bytes of a blob stored with `encoding`, decoded as they stream."""
+        if encoding is None:
+            yield from self.iter_chunks(key, chunk_size)
+            return
+        with self.open(stored_key(key, encoding)) as stream:
+            yield from compression.iter_decompressed(stream, chunk_size)
+
+    def iter_original_range(self, key: str, encoding: Optional[str], start: int, end: int, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        if encoding is None:
+            yield from self.iter_range(key, start, end, chunk_size)
+            return
+        with self.open(stored_key(key, encoding)) as stream:
+            yield from compression.iter_decompressed_range(stream, start, end, chunk_size)
+
+    @contextmanager
+    def materialize_original(self, key: str, encoding: Optional[str]) -> Iterator[Path]:
+        if encoding is None:
+            with self.materialize(key) as path:
+                yield path
+            return
+        settings.STAGING_DIR.mkdir(parents=True, exist_ok=True)
+        temp_path = settings.STAGING_DIR / f".{uuid.uuid4()}.part"
+        try:
+            with temp_path.open("wb") as target:
+                for chunk in self.iter_original(key, encoding, settings.UPLOAD_CHUNK_SIZE):
+                    target.write(chunk)
+            yield temp_path
+        finally:
+            temp_path.unlink(missing_ok=True)
+
+
+class LocalStorage(StorageBackend):
+    """Files under `root`, fanned out into `depth` levels of two-character key-prefix directories."""
+
+    def __init__(self, root: Path, depth: int = 2):
+        self.root = root
+        self.depth = depth
+
+    def path(self, key: str) -> Path:
+        shards = [key[i * 2:i * 2 + 2] for i in range(self.depth)]
+        return self.root.joinpath(*shards, key)
+
+    def exists(self, key: str) -> bool:
+        return self.path(key).exists()
+
+    def put(self, key: str, source: Path) -> bool:
+        target = self.path(key)
+        if target.exists():
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, target)
+        return True
+
+    def open(self, key: str) -> BinaryIO:
+        return self.path(key).open("rb")
+
+    def delete(self, key: str) -> None:
+        self.path(key).unlink(missing_ok=True)
+
+    def size(self, key: str) -> int:
+        return self.path(key).stat().st_size
+
+    @contextmanager
+    def materialize(self, key: str) -> Iterator[Path]:
+        yield self.path(key)
+
+    def keys(self) -> Iterator[str]:
+        pattern = "/".join(["??"] * self.depth + ["*"])
+        for path in self.root.glob(pattern):
+            if path.is_file() and not path.name.startswith("."):
+                yield path.name
+
+
+class S3Storage(StorageBackend):
+    """S3-compatible object storage; point `endpoint_url` at MinIO or moto for local runs."""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None, region: Optional[str] = None, client=None):
+        if client is None:
+            import boto3
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def put(self, key: str, source: Path) -> bool:
+        if self.exists(key):
+            return False
+        self.client.upload_file(str(source), self.bucket, self._object_key(key))
+        source.unlink(missing_ok=True)
+        return True
+
+    def open(self, key: str) -> BinaryIO:
+        return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))["Body"]
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+
+    def size(self, key: str) -> int:
+        return self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))["ContentLength"]
+
+    def iter_range(self, key: str, start: int, end: int, chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+        body = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key), Range=f"bytes={start}-{end}")["Body"]
+        with body:
+            while chunk := body.read(chunk_size):
+                yield chunk
+
+    def keys(self) -> Iterator[str]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for item in page.get("Contents", []):
+                yield item["Key"][len(self.prefix):]
+
+
+def create_backend() -> StorageBackend:
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(settings.UPLOAD_DIR, depth=settings.STORAGE_SHARD_DEPTH)
+    if settings.STORAGE_BACKEND == "s3":
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+        )
+    raise ValueError(f"Unknown storage backend '{settings.STORAGE_BACKEND}'")
+
+
+backend = create_backend()
+
+
+def stored_key(key: str, encoding: Optional[str]) -> str:
+    """Storage key of the object holding blob `key` in `encoding`."""
+    return key if encoding is None else key + compression.SUFFIXES[encoding]
+
+
+def _find_stored(upload: StagedUpload, encodings: List[Optional[str]]) -> bool:
+    for encoding in encodings:
+        key = stored_key(upload.key, encoding)
+        if backend.exists(key):
+            upload.encoding, upload.stored_size = encoding, backend.size(key)
+            return True
+    return False
+
+
+def store_blob(upload: StagedUpload) -> bool:
+    """Move a staged upload into the blob store; returns False if identical content was already stored.
+
+    Compressible content is stored compressed when that saves enough. Either way `upload.encoding`
+    and `upload.stored_size` describe the object now in storage. Unless it was moved in, the staged
+    file stays for the caller to discard, who may need it again (see reclamation).
+    """
+    encoding = compression.choose_encoding(upload.content_type, upload.size)
+    if _find_stored(upload, [encoding, None] if encoding else [None]):
+        return False
+    if encoding is not None:
+        compressed_path = upload.temp_path.with_name(upload.temp_path.name + compression.SUFFIXES[encoding])
+        try:
+            compressed_size = compression.compress_file(upload.temp_path, compressed_path)
+            if compressed_size <= upload.size * (1 - settings.COMPRESSION_MIN_SAVINGS):
+                upload.encoding, upload.stored_size = encoding, compressed_size
+                return backend.put(stored_key(upload.key, encoding), compressed_path)
+        finally:
+            compressed_path.unlink(missing_ok=True)
+    upload.encoding, upload.stored_size = None, upload.size
+    return backend.put(upload.key, upload.temp_path)
+
+
+def blob_exists(blob: StoredBlob) -> bool:
+    return backend.exists(stored_key(blob.key, blob.encoding))
+
+
+def preview_key(key: str) -> str:
+    return f"{key}.preview.png"
+
+
+def remove_blob(key: str) -> None:
+    backend.delete(key)
+    for encoding in compression.SUFFIXES:
+        backend.delete(stored_key(key, encoding))
+    backend.delete(preview_key(key))
+
+
+def migrate_flat_layout(source: Path = settings.UPLOAD_DIR, target: Optional[StorageBackend] = None) -> int:
+    """Move files sitting directly in `source` (the pre-sharding layout) into `target`."""
+    target = target or backend
+    moved = 0
+    for path in sorted(source.iterdir()):
+        if not path.is_file() or path.name.startswith("."):
+            continue
+        if not target.put(path.name, path):
+            path.unlink()
+        moved += 1
+    return moved
+
+
+def _write_chunk(buffer: BinaryIO, hasher, chunk: bytes) -> None:
+    hasher.update(chunk)
+    buffer.write(chunk)
+
+
+def stage_file(path: Path, directory: Path = settings.STAGING_DIR) -> StagedUpload:
+    """Copy a local file into `directory`, hashing it in the same pass."""
+    temp_path = directory / f".{uuid.uuid4()}.part"
+    hasher = hashlib.sha256()
+    size = 0
+    try:
+        with path.open("rb") as source, temp_path.open("wb") as target:
+            while chunk := source.read(settings.UPLOAD_CHUNK_SIZE):
+                _write_chunk(target, hasher, chunk)
+                size += len(chunk)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return StagedUpload(temp_path, hasher.hexdigest(), size, mimetypes.guess_type(path.name)[0])
+
+
+async def stage_upload(file: UploadFile, directory: Path = settings.STAGING_DIR) -> StagedUpload:
+    """Stream `file` into `directory` chunk by chunk, hashing it in the same pass."""
+    max_size = settings.MAX_UPLOAD_SIZE
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File exceeds the maximum upload size of {max_size} bytes."
+        )
+
+    temp_path = directory / f".{uuid.uuid4()}.part"
+    hasher = hashlib.sha256()
+    size = 0
+    buffer = await run_in_threadpool(temp_path.open, "wb")
+    try:
+        while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File exceeds the maximum upload size of {max_size} bytes."
+                )
+            await run_in_threadpool(_write_chunk, buffer, hasher, chunk)
+    except BaseException:
+        await run_in_threadpool(buffer.close)
+        temp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        await file.close()
+    await run_in_threadpool(buffer.close)
+    return StagedUpload(temp_path, hasher.hexdigest(), size, file.content_type)
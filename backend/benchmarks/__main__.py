@@ -0,0 +1,274 @@
+"""Benchmark suite entry point. From backend/:
+
+    python -m benchmarks run --output before.json
+    python -m benchmarks run --output after.json
+    python -m benchmarks compare before.json after.json
+    python -m benchmarks tuning --seconds 20
+    python -m benchmarks serialization --documents 10000
+
+`run` builds a fresh database and upload directory from a fixed seed, so two runs with the
+same arguments on the same machine measure the same work. `compare` exits non-zero when a
+latency percentile grows by more than --threshold or any operation issues more queries.
+`tuning` measures concurrent upload/sign throughput with DB_TUNING off and then on.
+`serialization` times rendering one large document list through each JSON response path.
+"""
+from pathlib import Path
+from typing import Iterator, Tuple
+import argparse
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _prepare_environment(workdir: Path, args) -> dict:
+    """Point the app at a throwaway database before anything imports `app.config`."""
+    overrides = {
+        "DATABASE_URL": args.database_url or f"sqlite:///{workdir / 'bench.db'}",
+        "UPLOAD_DIR_NAME": str(workdir / "uploads"),
+        "BCRYPT_ROUNDS": str(args.bcrypt_rounds),
+        "PROCESSING_ENABLED": "false",
+        "LOG_LEVEL": "WARNING",
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark-secret"),
+    }
+    os.environ.update(overrides)
+    return overrides
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(port: int, workers: int = 1) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+         "--workers", str(workers)],
+        cwd=BACKEND_DIR, env=os.environ.copy(),
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1).raise_for_status()
+            return server
+        except httpx.HTTPError:
+            if server.poll() is not None:
+                raise RuntimeError("Benchmark server exited during startup")
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Benchmark server did not start within 60s")
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args) -> dict:
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="docflow-bench-"))
+    workdir.mkdir(parents=True, exist_ok=True)
+    _prepare_environment(workdir, args)
+
+    from app import database
+    from app.config import settings
+    from benchmarks import datagen, http_scenario, micro
+
+    database.run_migrations()
+    settings.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    settings.STAGING_DIR.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    dataset = datagen.generate(args.users, args.documents, args.max_shares, args.sign_ratio, args.seed)
+    print(f"Generated {len(dataset.users)} users, {len(dataset.documents)} documents, "
+          f"{len(dataset.readable)} read grants, {dataset.signatures} signatures "
+          f"in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    results = {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": database.engine.dialect.name,
+            "params": {key: value for key, value in vars(args).items() if key not in ("func", "output", "workdir")},
+        },
+        "micro": micro.run(dataset, args.iterations, args.seed),
+    }
+
+    if not args.skip_http:
+        port = _free_port()
+        server = _start_server(port)
+        try:
+            results["http"] = http_scenario.run(
+                f"http://127.0.0.1:{port}", dataset, args.concurrency, args.http_iterations, args.seed
+            )
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    return results
+
+
+def _rows(results: dict) -> Iterator[Tuple[str, dict, object]]:
+    for name, result in results.get("micro", {}).items():
+        yield f"micro.{name}", result["latency_ms"], result["queries"]["mean"]
+    for name, result in results.get("http", {}).get("operations", {}).items():
+        yield f"http.{name}", result["latency_ms"], result["queries_per_request"]
+
+
+def report(results: dict) -> None:
+    print(f"{'operation':<36} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8}")
+    for name, latency, queries in _rows(results):
+        queries_text = "-" if queries is None else f"{queries:.1f}"
+        print(f"{name:<36} {latency['n']:>6} {latency['p50']:>9.2f} {latency['p95']:>9.2f} "
+              f"{latency['p99']:>9.2f} {queries_text:>8}")
+    if "http" in results:
+        print(f"http throughput: {results['http']['requests_per_second']:.1f} req/s")
+
+
+def tuning(args) -> dict:
+    """Run the write scenario once per DB_TUNING value, each against a fresh database."""
+    from benchmarks import write_load
+
+    results = {}
+    for label, enabled in (("defaults", "false"), ("tuned", "true")):
+        workdir = Path(tempfile.mkdtemp(prefix=f"docflow-bench-{label}-"))
+        _prepare_environment(workdir, args)
+        os.environ["DB_TUNING"] = enabled
+        # Lock waits under the untuned profile would otherwise flood the slow-query log.
+        os.environ["SLOW_QUERY_SECONDS"] = "0"
+        # Migrate up front; several uvicorn workers would otherwise race to create the schema.
+        subprocess.run([sys.executable, "-c", "from app.database import run_migrations; run_migrations()"],
+                       cwd=BACKEND_DIR, env=os.environ.copy(), check=True)
+        port = _free_port()
+        server = _start_server(port, args.server_workers)
+        try:
+            results[label] = write_load.run(f"http://127.0.0.1:{port}", label, args.concurrency, args.seconds, args.seed)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(f"{'profile':<10} {'operation':<8} {'per s':>8} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, result in results.items():
+        for operation, numbers in result["operations"].items():
+            latency = numbers["latency_ms"]
+            print(f"{label:<10} {operation:<8} {numbers['per_second']:>8.1f} {numbers['errors']:>7} "
+                  f"{latency['p50']:>9.2f} {latency['p95']:>9.2f} {latency['p99']:>9.2f}")
+    return results
+
+
+def serialization(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="docflow-bench-serialization-"))
+    _prepare_environment(workdir, args)
+
+    from app import database
+    from benchmarks import serialization as serialization_benchmark
+
+    database.run_migrations()
+    results = serialization_benchmark.run(args.documents, args.iterations)
+    print(f"{results['documents']} documents, encoder: {results['encoder']}")
+    print(f"{'path':<22} {'KB':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in results["paths"].items():
+        latency = result["latency_ms"]
+        print(f"{name:<22} {result['bytes'] / 1024:>8.0f} {latency['p50']:>9.2f} {latency['p95']:>9.2f} "
+              f"{latency['p99']:>9.2f}")
+    return results
+
+
+def compare(args) -> int:
+    old = json.loads(Path(args.baseline).read_text())
+    new = json.loads(Path(args.candidate).read_text())
+    if old["meta"]["params"] != new["meta"]["params"]:
+        print("warning: runs used different parameters; results are not directly comparable", file=sys.stderr)
+
+    baseline = {name: (latency, queries) for name, latency, queries in _rows(old)}
+    regressions = 0
+    print(f"{'operation':<36} {'p50':>16} {'p95':>16} {'queries':>12}")
+    for name, latency, queries in _rows(new):
+        if name not in baseline:
+            continue
+        old_latency, old_queries = baseline[name]
+        cells = []
+        for key in ("p50", "p95"):
+            ratio = latency[key] / old_latency[key] if old_latency[key] else 1.0
+            flag = "!" if ratio > 1 + args.threshold else " "
+            regressions += flag == "!"
+            cells.append(f"{ratio - 1:+7.1%}{flag}")
+        if queries is None or old_queries is None:
+            query_cell = "-"
+        else:
+            flag = "!" if queries > old_queries + 1e-9 else " "
+            regressions += flag == "!"
+            query_cell = f"{old_queries:.1f}->{queries:.1f}{flag}"
+        print(f"{name:<36} {cells[0]:>16} {cells[1]:>16} {query_cell:>12}")
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%} latency or any added query")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Document API benchmarks.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subcommands.add_parser("run", help="Generate data, run micro and HTTP benchmarks, write JSON.")
+    run_parser.add_argument("--users", type=int, default=50)
+    run_parser.add_argument("--documents", type=int, default=1000)
+    run_parser.add_argument("--max-shares", type=int, default=8)
+    run_parser.add_argument("--sign-ratio", type=float, default=0.5)
+    run_parser.add_argument("--iterations", type=int, default=200, help="Calls per micro-benchmark.")
+    run_parser.add_argument("--concurrency", type=int, default=8, help="HTTP virtual users.")
+    run_parser.add_argument("--http-iterations", type=int, default=25, help="Scenario loops per virtual user.")
+    run_parser.add_argument("--bcrypt-rounds", type=int, default=12)
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--database-url", help="Use this (empty) database instead of a fresh SQLite file.")
+    run_parser.add_argument("--workdir", help="Keep the database and uploads here instead of a temp dir.")
+    run_parser.add_argument("--skip-http", action="store_true")
+    run_parser.add_argument("--output", help="Write results as JSON to this file.")
+
+    compare_parser = subcommands.add_parser("compare", help="Compare two result files.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=0.10, help="Allowed relative latency growth.")
+
+    tuning_parser = subcommands.add_parser("tuning", help="Concurrent upload/sign throughput without and with DB_TUNING.")
+    tuning_parser.add_argument("--concurrency", type=int, default=16, help="Virtual users uploading and signing.")
+    tuning_parser.add_argument("--seconds", type=float, default=20.0, help="Duration of each run.")
+    tuning_parser.add_argument("--server-workers", type=int, default=2, help="uvicorn worker processes.")
+    tuning_parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    tuning_parser.add_argument("--seed", type=int, default=1)
+    tuning_parser.add_argument("--database-url", help="Use this database for both runs instead of fresh SQLite files.")
+    tuning_parser.add_argument("--output", help="Write results as JSON to this file.")
+
+    serialization_parser = subcommands.add_parser(
+        "serialization", help="Render one large document list through each JSON response path.")
+    serialization_parser.add_argument("--documents", type=int, default=10000)
+    serialization_parser.add_argument("--iterations", type=int, default=20)
+    serialization_parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    serialization_parser.add_argument("--database-url", help="Use this (empty) database instead of a fresh SQLite file.")
+    serialization_parser.add_argument("--output", help="Write results as JSON to this file.")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        return compare(args)
+    if args.command in ("tuning", "serialization"):
+        results = tuning(args) if args.command == "tuning" else serialization(args)
+        if args.output:
+            Path(args.output).write_text(json.dumps(results, indent=2))
+        return 0
+
+    results = run(args)
+    report(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
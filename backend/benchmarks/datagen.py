@@ -0,0 +1,93 @@
+"""Synthetic users, documents, shares and signatures, created through `crud` like the API would."""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Tuple
+import hashlib
+import random
+import uuid
+
+WORDS = (
+    "contract invoice report agreement policy memo budget forecast audit review "
+    "quarterly annual draft final signed approval vendor client project schedule"
+).split()
+
+
+@dataclass
+class Dataset:
+    password: str
+    users: List[Tuple[int, str]] = field(default_factory=list)
+    documents: List[Tuple[int, int]] = field(default_factory=list)
+    # (document_id, user_id) pairs the user may read, owners included.
+    readable: List[Tuple[int, int]] = field(default_factory=list)
+    signatures: int = 0
+
+
+def _text(rng: random.Random, words: int) -> bytes:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).encode()
+
+
+def _stage(content: bytes):
+    from app import storage
+    from app.config import settings
+
+    temp_path = settings.STAGING_DIR / f".{uuid.uuid4()}.part"
+    temp_path.write_bytes(content)
+    return storage.StagedUpload(temp_path, hashlib.sha256(content).hexdigest(), len(content))
+
+
+def generate(users: int, documents: int, max_shares: int, sign_ratio: float, seed: int) -> Dataset:
+    """Owners follow a long-tail distribution; each document is shared with up to `max_shares` users."""
+    from sqlmodel import Session
+    from app import auth, crud, models, schemas, storage
+    from app.database import engine
+
+    rng = random.Random(seed)
+    dataset = Dataset(password="benchmark-password")
+    # One bcrypt call for everybody; the cost of hashing is not what this data is for.
+    hashed_password = auth.get_password_hash(dataset.password)
+    base_date = datetime(2024, 1, 1)
+
+    with Session(engine, expire_on_commit=False) as session:
+        for i in range(users):
+            user_in = models.UserCreate(email=f"user{i}@bench.example", password=dataset.password, full_name=f"User {i}")
+            user = crud.create_user(session, user_in, hashed_password=hashed_password)
+            dataset.users.append((user.id, user.email))
+
+        for i in range(documents):
+            owner_id, _ = dataset.users[min(int(rng.paretovariate(1.2)) - 1, users - 1)]
+            staged = _stage(_text(rng, rng.randint(50, 2000)))
+            doc_in = models.DocumentCreate(
+                title=f"{rng.choice(WORDS).title()} {i}",
+                description=_text(rng, 12).decode(),
+                filename=staged.key,
+                original_filename=f"doc{i}.txt",
+                content_type="text/plain",
+                sha256=staged.sha256,
+                size=staged.size,
+                upload_date=base_date + timedelta(minutes=i),
+            )
+            try:
+                storage.store_blob(staged)
+            finally:
+                staged.discard()
+            doc = crud.create_document(session, doc_in, owner_id=owner_id, blob=staged.stored())
+            crud.grant_permission(session, doc.id, owner_id, owner_id, can_view=True, can_sign=True)
+            dataset.documents.append((doc.id, owner_id))
+            dataset.readable.append((doc.id, owner_id))
+
+            others = [user for user in dataset.users if user[0] != owner_id]
+            shares = [
+                schemas.ShareDocumentRequest(email=email, can_view=True, can_sign=rng.random() < 0.5)
+                for _, email in rng.sample(others, min(len(others), rng.randint(0, max_shares)))
+            ]
+            if not shares:
+                continue
+            crud.grant_permissions_bulk(session, doc.id, owner_id, shares)
+            ids_by_email = dict((email, user_id) for user_id, email in dataset.users)
+            for share in shares:
+                signer_id = ids_by_email[share.email]
+                dataset.readable.append((doc.id, signer_id))
+                if share.can_sign and rng.random() < sign_ratio:
+                    crud.create_signature(session, doc.id, signer_id, models.SignatureCreate(comments="ok"))
+                    dataset.signatures += 1
+    return dataset
@@ -0,0 +1,87 @@
+"""Virtual users logging in, browsing, downloading, uploading and signing against a live server."""
+from collections import defaultdict
+from typing import Dict, List
+import asyncio
+import random
+import re
+import time
+import httpx
+from benchmarks.datagen import Dataset
+from benchmarks.stats import summarize
+
+ROUTES = {
+    "login": "/users/login/",
+    "list": "/documents/getDocuments/",
+    "detail": "/documents/getDocument/{document_id}/",
+    "download": "/documents/downloadDocument/{document_id}/",
+    "upload": "/documents/addDocument/",
+    "sign": "/documents/signDocument/{document_id}/",
+}
+
+_SAMPLE = re.compile(r'^db_queries_per_request_(sum|count)\{route="([^"]+)"\} (\S+)$', re.MULTILINE)
+
+
+async def _db_queries_by_route(client: httpx.AsyncClient) -> Dict[str, List[float]]:
+    text = (await client.get("/metrics")).text
+    totals: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0])
+    for kind, route, value in _SAMPLE.findall(text):
+        totals[route][0 if kind == "sum" else 1] = float(value)
+    return totals
+
+
+async def _virtual_user(client: httpx.AsyncClient, email: str, password: str, iterations: int,
+                        rng: random.Random, timings: Dict[str, List[float]]) -> None:
+    async def timed(operation: str, request):
+        start = time.perf_counter()
+        response = await request
+        timings[operation].append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        return response
+
+    response = await timed("login", client.post(ROUTES["login"], data={"username": email, "password": password}))
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    for i in range(iterations):
+        documents = (await timed("list", client.get(ROUTES["list"], params={"limit": 50}, headers=headers))).json()["documents"]
+        if documents:
+            document_id = rng.choice(documents)["id"]
+            await timed("detail", client.get(ROUTES["detail"].format(document_id=document_id), headers=headers))
+            await timed("download", client.get(ROUTES["download"].format(document_id=document_id), headers=headers))
+        if i % 5 == 0:
+            content = " ".join(rng.choice(("alpha", "beta", "gamma", "delta")) for _ in range(500)).encode()
+            response = await timed("upload", client.post(
+                ROUTES["upload"], data={"title": f"Load {i}"}, files={"file": (f"load{i}.txt", content, "text/plain")},
+                headers=headers,
+            ))
+            document_id = response.json()["document"]["id"]
+            await timed("sign", client.post(
+                ROUTES["sign"].format(document_id=document_id), json={"comments": "load"}, headers=headers
+            ))
+
+
+async def _run(base_url: str, dataset: Dataset, concurrency: int, iterations: int, seed: int) -> Dict[str, dict]:
+    timings: Dict[str, List[float]] = defaultdict(list)
+    limits = httpx.Limits(max_connections=concurrency + 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        before = await _db_queries_by_route(client)
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _virtual_user(client, email, dataset.password, iterations, random.Random(seed + i), timings)
+            for i, (_, email) in enumerate(dataset.users[:concurrency])
+        ))
+        elapsed = time.perf_counter() - start
+        after = await _db_queries_by_route(client)
+
+    results = {"wall_seconds": elapsed, "requests_per_second": sum(map(len, timings.values())) / elapsed, "operations": {}}
+    for operation, route in ROUTES.items():
+        query_sum = after[route][0] - before[route][0]
+        query_count = after[route][1] - before[route][1]
+        results["operations"][operation] = {
+            "latency_ms": summarize(timings[operation]),
+            "queries_per_request": query_sum / query_count if query_count else None,
+        }
+    return results
+
+
+def run(base_url: str, dataset: Dataset, concurrency: int, iterations: int, seed: int) -> Dict[str, dict]:
+    return asyncio.run(_run(base_url, dataset, concurrency, iterations, seed))
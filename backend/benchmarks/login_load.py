@@ -0,0 +1,76 @@
+"""Login throughput and its effect on other requests.
+
+Runs against a live server (uvicorn app.main:app). Measures /users/me/ latency on its
+own, then again while `--concurrency` clients log in as fast as they can:
+
+    python benchmarks/login_load.py --base-url http://localhost:8000 --seconds 10
+
+Requires httpx.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        return {"p50": samples[0] if samples else 0.0, "p95": 0.0, "p99": 0.0}
+    cuts = statistics.quantiles(samples, n=100)
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
+
+
+async def probe(client: httpx.AsyncClient, headers: dict, stop: asyncio.Event, latencies: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/users/me/", headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+
+async def login_loop(client: httpx.AsyncClient, email: str, password: str, stop: asyncio.Event, counts: dict):
+    while not stop.is_set():
+        response = await client.post("/users/login/", data={"username": email, "password": password})
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+
+
+async def run_phase(client, headers, seconds, logins, email, password):
+    stop = asyncio.Event()
+    latencies, counts = [], {}
+    tasks = [asyncio.create_task(probe(client, headers, stop, latencies))]
+    tasks += [asyncio.create_task(login_loop(client, email, password, stop, counts)) for _ in range(logins)]
+    await asyncio.sleep(seconds)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies, counts
+
+
+async def main(args):
+    email, password = f"bench-{uuid.uuid4().hex[:8]}@example.com", "bench-password"
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        response = await client.post("/users/register/", json={"email": email, "password": password})
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        idle, _ = await run_phase(client, headers, args.seconds, 0, email, password)
+        loaded, counts = await run_phase(client, headers, args.seconds, args.concurrency, email, password)
+
+    print(f"logins: {sum(counts.values())} in {args.seconds}s "
+          f"({counts.get(200, 0) / args.seconds:.1f}/s ok), status counts {counts}")
+    for name, samples in (("idle", idle), ("under login load", loaded)):
+        stats = percentiles(samples)
+        print(f"/users/me/ {name}: n={len(samples)} "
+              + " ".join(f"{key}={value:.1f}ms" for key, value in stats.items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,77 @@
+"""Time single crud calls, each in its own session as a request would make them, and count their queries."""
+from typing import Callable, Dict
+import random
+import time
+from benchmarks.datagen import Dataset
+from benchmarks.stats import summarize
+
+
+def _measure(call: Callable, iterations: int) -> Dict[str, dict]:
+    from sqlmodel import Session
+    from app import metrics
+    from app.database import engine
+
+    latencies, queries = [], []
+    for i in range(iterations):
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        try:
+            with Session(engine, expire_on_commit=False) as session:
+                start = time.perf_counter()
+                call(session, i)
+                latencies.append((time.perf_counter() - start) * 1000)
+        finally:
+            metrics.current_request.reset(token)
+        queries.append(stats.queries)
+    return {"latency_ms": summarize(latencies), "queries": summarize(queries)}
+
+
+def run(dataset: Dataset, iterations: int, seed: int) -> Dict[str, dict]:
+    from sqlmodel import Session
+    from app import crud, models
+    from app.database import engine
+
+    rng = random.Random(seed)
+    results = {}
+
+    # Reads first, so the writes below do not change the data they see.
+    users = [rng.choice(dataset.users)[0] for _ in range(iterations)]
+    results["get_documents_for_user"] = _measure(
+        lambda session, i: crud.get_documents_for_user(session, users[i], limit=100),
+        iterations,
+    )
+
+    pairs = [rng.choice(dataset.readable) for _ in range(iterations)]
+    results["get_document_with_details"] = _measure(
+        lambda session, i: crud.get_document_with_details(session, *pairs[i]),
+        iterations,
+    )
+
+    grants = []
+    for _ in range(iterations):
+        document_id, owner_id = rng.choice(dataset.documents)
+        grants.append((document_id, owner_id, rng.choice(dataset.users)[0]))
+    results["grant_permission"] = _measure(
+        lambda session, i: crud.grant_permission(session, *grants[i], can_view=True, can_sign=False),
+        iterations,
+    )
+
+    # Each signature needs a fresh (document, signer) pair with sign rights; set those up untimed.
+    readable = set(dataset.readable)
+    candidates = [
+        (document_id, owner_id, user_id)
+        for document_id, owner_id in dataset.documents
+        for user_id, _ in dataset.users
+        if (document_id, user_id) not in readable
+    ]
+    signings = rng.sample(candidates, min(iterations, len(candidates)))
+    with Session(engine) as session:
+        for document_id, owner_id, user_id in signings:
+            crud.grant_permission(session, document_id, owner_id, user_id, can_view=True, can_sign=True)
+    results["create_signature"] = _measure(
+        lambda session, i: crud.create_signature(
+            session, signings[i][0], signings[i][2], models.SignatureCreate(comments="benchmark")
+        ),
+        len(signings),
+    )
+    return results
@@ -0,0 +1,91 @@
+"""Time turning a large page of documents into a JSON body, the way each response path does it.
+
+The rows are loaded from a real database (with their owners), so attribute access costs what it
+does in a request. No HTTP is involved: only the work between the query and the bytes is timed.
+"""
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+import asyncio
+import json
+import time
+from benchmarks.stats import summarize
+
+
+def _load_rows(documents: int) -> List:
+    from sqlalchemy.orm import selectinload
+    from sqlmodel import Session, select
+    from app import models
+    from app.database import engine
+
+    with Session(engine) as session:
+        owner = models.User(email="serialization@bench.local", hashed_password="-", full_name="Bench Owner")
+        session.add(owner)
+        session.flush()
+        start = datetime(2024, 1, 1)
+        session.add_all(
+            models.Document(
+                title=f"Document {i}", description=f"Description of document {i}", filename=f"{i:064x}",
+                original_filename=f"document-{i}.pdf", content_type="application/pdf", sha256=f"{i:064x}",
+                size=1000 + i, upload_date=start + timedelta(seconds=i), owner_id=owner.id,
+                processing_status="done", page_count=1 + i % 20,
+            )
+            for i in range(documents)
+        )
+        session.commit()
+
+    with Session(engine, expire_on_commit=False) as session:
+        rows = session.exec(
+            select(models.Document).options(selectinload(models.Document.owner)).order_by(models.Document.id)
+        ).all()
+        session.expunge_all()
+    return list(rows)
+
+
+def _paths(rows: List, loop: asyncio.AbstractEventLoop) -> Dict[str, Callable[[], bytes]]:
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+    from app import schemas, serialization
+
+    field = create_model_field(name="response", type_=schemas.DocumentListResponse, mode="serialization")
+
+    def response_model() -> bytes:
+        # A handler returning validated models, re-validated and encoded by FastAPI against response_model.
+        payload = schemas.DocumentListResponse(documents=[schemas.DocumentRead.model_validate(row) for row in rows])
+        content = loop.run_until_complete(serialize_response(field=field, response_content=payload))
+        return JSONResponse(content).body
+
+    def validate_dump() -> bytes:
+        payload = schemas.DocumentListResponse(documents=[schemas.DocumentRead.model_validate(row) for row in rows])
+        return payload.model_dump_json().encode()
+
+    def serializer() -> bytes:
+        return serialization.DOCUMENT_LIST.render({"documents": rows, "next_cursor": None})
+
+    return {"response_model": response_model, "validate_dump_json": validate_dump, "serializer": serializer}
+
+
+def run(documents: int, iterations: int) -> dict:
+    from app import serialization
+
+    rows = _load_rows(documents)
+    loop = asyncio.new_event_loop()
+    paths = _paths(rows, loop)
+    expected = json.loads(paths["validate_dump_json"]())
+    results = {}
+    for name, render in paths.items():
+        body = render()
+        if json.loads(body) != expected:
+            raise AssertionError(f"{name} produced a different document list")
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            render()
+            timings.append((time.perf_counter() - start) * 1000)
+        results[name] = {"bytes": len(body), "latency_ms": summarize(timings)}
+    loop.close()
+    return {
+        "documents": len(rows),
+        "encoder": "orjson" if serialization.orjson is not None else "json",
+        "paths": results,
+    }
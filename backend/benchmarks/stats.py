@@ -0,0 +1,20 @@
+from typing import Dict, Sequence
+import statistics
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """Count, mean and nearest-rank p50/p95/p99 of `samples`."""
+    if not samples:
+        return {"n": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+    return {
+        "n": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": rank(50),
+        "p95": rank(95),
+        "p99": rank(99),
+    }
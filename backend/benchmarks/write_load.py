@@ -0,0 +1,77 @@
+"""Concurrent uploads and signatures against a live server, for comparing database settings.
+
+Each virtual user registers, then uploads a small file and signs it in a loop until time runs out.
+Failed requests (e.g. "database is locked" turned into a 500) are counted rather than raised.
+"""
+from collections import defaultdict
+from typing import Dict, List
+import asyncio
+import random
+import time
+import httpx
+from benchmarks.http_scenario import ROUTES
+from benchmarks.stats import summarize
+
+
+async def _virtual_user(client: httpx.AsyncClient, email: str, seconds: float, rng: random.Random,
+                        timings: Dict[str, List[float]], errors: Dict[str, int]) -> None:
+    response = await client.post("/users/register/", json={"email": email, "password": "benchmark"})
+    response.raise_for_status()
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def timed(operation: str, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            errors[operation] += 1
+            return None
+        if response.is_error:
+            errors[operation] += 1
+            return None
+        timings[operation].append((time.perf_counter() - start) * 1000)
+        return response
+
+    deadline = time.monotonic() + seconds
+    i = 0
+    while time.monotonic() < deadline:
+        content = " ".join(rng.choice(("alpha", "beta", "gamma", "delta")) for _ in range(200)).encode()
+        response = await timed("upload", client.post(
+            ROUTES["upload"], data={"title": f"Write {i}"}, files={"file": (f"write{i}.txt", content, "text/plain")},
+            headers=headers,
+        ))
+        if response is not None:
+            await timed("sign", client.post(
+                ROUTES["sign"].format(document_id=response.json()["document"]["id"]), json={"comments": "load"},
+                headers=headers,
+            ))
+        i += 1
+
+
+async def _run(base_url: str, label: str, concurrency: int, seconds: float, seed: int) -> dict:
+    timings: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    limits = httpx.Limits(max_connections=concurrency + 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            _virtual_user(client, f"writer{i}-{label}@bench.local", seconds, random.Random(seed + i), timings, errors)
+            for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "wall_seconds": elapsed,
+        "operations": {
+            operation: {
+                "per_second": len(timings[operation]) / elapsed,
+                "errors": errors[operation],
+                "latency_ms": summarize(timings[operation]),
+            }
+            for operation in ("upload", "sign")
+        },
+    }
+
+
+def run(base_url: str, label: str, concurrency: int, seconds: float, seed: int) -> dict:
+    return asyncio.run(_run(base_url, label, concurrency, seconds, seed))
@@ -0,0 +1,84 @@
+"""The app runs against a throwaway SQLite database and upload directory for the whole test session.
+
+The environment is set before `app.config` is first imported, so run pytest from `backend/`:
+
+    python -m pytest tests
+"""
+from itertools import count
+from pathlib import Path
+from types import SimpleNamespace
+import os
+import tempfile
+import pytest
+
+_workdir = Path(tempfile.mkdtemp(prefix="docflow-tests-"))
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_workdir / 'test.db'}",
+    "DATABASE_REPLICA_URLS": "",
+    "DB_ASYNC": "false",
+    "UPLOAD_DIR_NAME": str(_workdir / "uploads"),
+    "SECRET_KEY": "test-secret",
+    "BCRYPT_ROUNDS": "4",
+    "PROCESSING_ENABLED": "false",
+    "STORAGE_COMPRESSION": "",
+    "INVALIDATION_REDIS_URL": "",
+    "LOG_LEVEL": "WARNING",
+})
+
+_ids = count(1)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    from app import acl, auth, dependencies
+
+    for cache in (acl.acl_cache, auth.user_cache, dependencies.recent_writers):
+        cache.clear()
+    yield
+
+
+@pytest.fixture
+def make_user(client):
+    def make(name: str = "user") -> SimpleNamespace:
+        email = f"{name}-{next(_ids)}@test.local"
+        response = client.post("/users/register/", json={"email": email, "password": "password"})
+        assert response.status_code == 201, response.text
+        body = response.json()
+        return SimpleNamespace(
+            id=body["user"]["id"], email=email, headers={"Authorization": f"Bearer {body['access_token']}"}
+        )
+    return make
+
+
+@pytest.fixture
+def upload(client):
+    def upload(user: SimpleNamespace, content: bytes = b"hello world", filename: str = "a.txt",
+               content_type: str = "text/plain") -> dict:
+        response = client.post(
+            "/documents/addDocument/", data={"title": filename}, files={"file": (filename, content, content_type)},
+            headers=user.headers,
+        )
+        assert response.status_code == 201, response.text
+        return response.json()["document"]
+    return upload
+
+
+@pytest.fixture
+def share(client):
+    def share(owner: SimpleNamespace, document_id: int, user: SimpleNamespace, can_view: bool = True,
+              can_sign: bool = False) -> None:
+        response = client.post(
+            f"/documents/addUser/{document_id}/", json={"email": user.email, "can_view": can_view, "can_sign": can_sign},
+            headers=owner.headers,
+        )
+        assert response.status_code == 200, response.text
+    return share
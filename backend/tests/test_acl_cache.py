@@ -0,0 +1,69 @@
+from sqlalchemy import text
+from sqlmodel import Session
+from app import acl, crud
+from app.database import engine
+
+
+def _download(client, user, document_id: int) -> int:
+    return client.get(f"/documents/downloadDocument/{document_id}/", headers=user.headers).status_code
+
+
+def test_share_and_revoke_reach_a_cached_decision(client, make_user, upload, share):
+    owner, reader = make_user("owner"), make_user("reader")
+    document = upload(owner)
+
+    assert _download(client, reader, document["id"]) == 404
+    assert acl.lookup(document["id"], reader.id) is not acl.MISSING
+
+    share(owner, document["id"], reader)
+    assert _download(client, reader, document["id"]) == 200
+
+    share(owner, document["id"], reader, can_view=False)
+    assert _download(client, reader, document["id"]) == 404
+
+
+def test_delete_reaches_a_cached_decision(client, make_user, upload, share):
+    owner, reader = make_user("owner"), make_user("reader")
+    document = upload(owner)
+    share(owner, document["id"], reader)
+    assert _download(client, owner, document["id"]) == 200
+    assert _download(client, reader, document["id"]) == 200
+
+    response = client.delete(f"/documents/deleteDocument/{document['id']}/", headers=owner.headers)
+    assert response.status_code == 204
+    assert _download(client, owner, document["id"]) == 404
+    assert _download(client, reader, document["id"]) == 404
+
+
+def test_decision_read_before_an_invalidation_is_not_cached(client, make_user, upload, share):
+    owner, reader = make_user("owner"), make_user("reader")
+    document = upload(owner)
+    share(owner, document["id"], reader)
+
+    with Session(engine) as session:
+        # The transaction begins before the revoke below, so what it reads may predate it.
+        session.execute(text("SELECT 1"))
+        share(owner, document["id"], reader, can_view=False)
+        crud.get_access(session, document["id"], reader.id)
+
+    assert acl.lookup(document["id"], reader.id) is acl.MISSING
+    assert _download(client, reader, document["id"]) == 404
+
+
+def test_bulk_delete_invalidates_with_one_message(client, make_user, upload, monkeypatch):
+    owner = make_user("owner")
+    ids = [upload(owner)["id"] for _ in range(3)]
+    for document_id in ids:
+        assert _download(client, owner, document_id) == 200
+        assert acl.lookup(document_id, owner.id) is not acl.MISSING
+
+    messages = []
+    publish = acl.channel.publish
+    monkeypatch.setattr(acl.channel, "publish", lambda message: (messages.append(message), publish(message)))
+    response = client.post("/documents/deleteDocuments/", json={"document_ids": ids}, headers=owner.headers)
+    assert response.status_code == 200
+
+    acl_messages = [message for message in messages if message["type"] == "acl"]
+    assert len(acl_messages) == 1
+    assert sorted(acl_messages[0]["document_ids"]) == sorted(ids)
+    assert all(acl.lookup(document_id, owner.id) is acl.MISSING for document_id in ids)
@@ -0,0 +1,32 @@
+import io
+import zipfile
+
+
+def _archive(client, user, document_ids):
+    return client.get("/documents/downloadDocuments/", params={"document_ids": document_ids}, headers=user.headers)
+
+
+def test_archive_holds_each_document_under_a_unique_name(client, make_user, upload, share):
+    owner, reader = make_user("owner"), make_user("reader")
+    first = upload(owner, content=b"first report", filename="report.txt")
+    second = upload(owner, content=b"second report", filename="report.txt")
+    shared = upload(reader, content=b"shared notes", filename="notes.md")
+    share(reader, shared["id"], owner)
+
+    response = _archive(client, owner, [first["id"], second["id"], shared["id"]])
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert archive.testzip() is None
+        assert archive.namelist() == ["report.txt", "report (2).txt", "notes.md"]
+        assert [archive.read(name) for name in archive.namelist()] == [b"first report", b"second report", b"shared notes"]
+
+
+def test_archive_rejects_documents_the_user_cannot_view(client, make_user, upload):
+    owner, stranger = make_user("owner"), make_user("stranger")
+    own = upload(stranger, content=b"mine")
+    private = upload(owner, content=b"private")
+
+    response = _archive(client, stranger, [own["id"], private["id"]])
+    assert response.status_code == 404
+    assert str([private["id"]]) in response.json()["detail"]
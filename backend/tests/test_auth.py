@@ -0,0 +1,70 @@
+import re
+from passlib.context import CryptContext
+from sqlmodel import Session
+from app import auth, models
+from app.config import settings
+from app.database import engine
+
+
+def _histogram(client, name: str, route: str) -> dict:
+    """Cumulative bucket counts of one metric series, keyed by the `le` label."""
+    text = client.get("/metrics").text
+    pattern = re.compile(rf'^{name}_bucket\{{route="{re.escape(route)}",le="([^"]+)"\}} (\d+)$', re.MULTILINE)
+    return {le: int(value) for le, value in pattern.findall(text)}
+
+
+def test_user_lookups_per_request_are_exported(client, make_user):
+    user = make_user()
+    before = _histogram(client, "auth_db_lookups_per_request", "/users/me/")
+
+    # The first request misses the user cache, the second is served from it.
+    assert client.get("/users/me/", headers=user.headers).status_code == 200
+    assert client.get("/users/me/", headers=user.headers).status_code == 200
+
+    after = _histogram(client, "auth_db_lookups_per_request", "/users/me/")
+    assert after["0.0"] - before.get("0.0", 0) == 1
+    assert after["1.0"] - before.get("1.0", 0) == 2
+
+
+def test_deactivation_takes_effect_despite_the_user_cache(client, make_user):
+    user = make_user()
+    assert client.get("/users/me/", headers=user.headers).status_code == 200
+
+    response = client.post("/users/me/deactivate/", headers=user.headers)
+    assert response.status_code == 200
+    assert response.json()["is_active"] is False
+
+    response = client.get("/users/me/", headers=user.headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+
+def _stored_hash(user) -> str:
+    with Session(engine) as session:
+        return session.get(models.User, user.id).hashed_password
+
+
+def _login(client, user):
+    return client.post("/users/login/", data={"username": user.email, "password": "password"})
+
+
+def test_login_rehashes_only_outdated_hashes(client, make_user, monkeypatch):
+    user = make_user()
+    current = _stored_hash(user)
+    assert _login(client, user).status_code == 200
+    assert _stored_hash(user) == current
+
+    # Raising the configured cost leaves the existing hash with fewer rounds than required.
+    rounds = settings.BCRYPT_ROUNDS + 1
+    monkeypatch.setattr(auth, "pwd_context", CryptContext(
+        schemes=["bcrypt"], deprecated="auto",
+        bcrypt__default_rounds=rounds, bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds,
+    ))
+    assert _login(client, user).status_code == 200
+    upgraded = _stored_hash(user)
+    assert upgraded != current
+    assert upgraded.split("$")[2] == f"{rounds:02d}"
+    assert not auth.pwd_context.needs_update(upgraded)
+
+    assert _login(client, user).status_code == 200
+    assert _stored_hash(user) == upgraded
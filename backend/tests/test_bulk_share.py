@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+from app import models
+from app.config import settings
+from app.database import engine
+
+
+def _permitted_users(document_id: int) -> set:
+    with Session(engine) as session:
+        return set(session.exec(
+            select(models.DocumentPermission.user_id).where(models.DocumentPermission.document_id == document_id)
+        ).all())
+
+
+def _share_many(client, owner, document_id: int, shares: list):
+    return client.post(f"/documents/addUsers/{document_id}/", json={"shares": shares}, headers=owner.headers)
+
+
+def test_mixed_batch_reports_each_email(client, make_user, upload):
+    owner, viewer, signer = make_user("owner"), make_user("viewer"), make_user("signer")
+    document = upload(owner)
+    response = _share_many(client, owner, document["id"], [
+        {"email": viewer.email},
+        {"email": "nobody@test.local", "can_sign": True},
+        {"email": signer.email, "can_sign": True},
+    ])
+    assert response.status_code == 200
+
+    results = response.json()["results"]
+    assert [(result["email"], result["granted"]) for result in results] == [
+        (viewer.email, True), ("nobody@test.local", False), (signer.email, True)
+    ]
+    assert results[1]["permission"] is None
+    assert results[1]["detail"] == "User with this email not found"
+    assert (results[0]["permission"]["can_sign"], results[2]["permission"]["can_sign"]) == (False, True)
+    assert _permitted_users(document["id"]) == {owner.id, viewer.id, signer.id}
+
+
+def test_failed_batch_grants_nothing(client, make_user, upload):
+    owner, first, second = make_user("owner"), make_user("first"), make_user("second")
+    document = upload(owner)
+
+    def fail(session):
+        raise RuntimeError("commit failed")
+
+    event.listen(OrmSession, "before_commit", fail)
+    try:
+        with pytest.raises(RuntimeError):
+            _share_many(client, owner, document["id"], [{"email": first.email}, {"email": second.email}])
+    finally:
+        event.remove(OrmSession, "before_commit", fail)
+    assert _permitted_users(document["id"]) == {owner.id}
+
+
+def test_batch_size_is_capped(client, make_user, upload):
+    owner = make_user("owner")
+    document = upload(owner)
+    shares = [{"email": f"user{i}@test.local"} for i in range(settings.MAX_BATCH_SHARE_USERS + 1)]
+    assert _share_many(client, owner, document["id"], shares).status_code == 400
+    assert _share_many(client, owner, document["id"], shares[:-1]).status_code == 200
@@ -0,0 +1,62 @@
+import pytest
+from sqlmodel import Session
+from app import models, storage
+from app.config import settings
+from app.database import engine
+
+pytest.importorskip("zstandard")
+
+CONTENT = b"".join(f"{i:06d} the quick brown fox jumps over the lazy dog {i * 7919 % 10007}\n".encode() for i in range(4000))
+
+
+@pytest.fixture
+def compressed(monkeypatch, make_user, upload):
+    monkeypatch.setattr(settings, "STORAGE_COMPRESSION", "zstd")
+    # Small chunks make ranges start and end inside decompressed chunks rather than on their edges.
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 4096)
+    owner = make_user("owner")
+    return owner, upload(owner, content=CONTENT, filename="log.txt")
+
+
+def _download(client, owner, document, **headers):
+    return client.get(
+        f"/documents/downloadDocument/{document['id']}/",
+        headers={**owner.headers, "Accept-Encoding": "identity", **headers},
+    )
+
+
+def test_compressed_blob_round_trips(client, compressed):
+    owner, document = compressed
+    with Session(engine) as session:
+        blob = session.get(models.Blob, document["sha256"])
+        assert (blob.encoding, blob.size) == ("zstd", len(CONTENT))
+        assert blob.stored_size < len(CONTENT) // 2
+    assert storage.backend.size(storage.stored_key(blob.sha256, blob.encoding)) == blob.stored_size
+    assert b"".join(storage.backend.iter_original(blob.sha256, blob.encoding, 4096)) == CONTENT
+
+    response = _download(client, owner, document)
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.content == CONTENT
+
+
+@pytest.mark.parametrize("header, start, end", [
+    ("bytes=0-0", 0, 0),
+    ("bytes=4090-4100", 4090, 4100),
+    ("bytes=10000-50000", 10000, 50000),
+    ("bytes=-100", len(CONTENT) - 100, len(CONTENT) - 1),
+    (f"bytes={len(CONTENT) - 5000}-", len(CONTENT) - 5000, len(CONTENT) - 1),
+])
+def test_ranges_of_a_compressed_blob(client, compressed, header, start, end):
+    owner, document = compressed
+    response = _download(client, owner, document, Range=header)
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(CONTENT)}"
+    assert response.content == CONTENT[start:end + 1]
+
+
+def test_range_past_the_end_of_a_compressed_blob(client, compressed):
+    owner, document = compressed
+    response = _download(client, owner, document, Range=f"bytes={len(CONTENT)}-")
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
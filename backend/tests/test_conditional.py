@@ -0,0 +1,78 @@
+from datetime import datetime
+from sqlalchemy import update
+from sqlmodel import Session
+from app import models, storage
+from app.database import engine
+
+LAST_MODIFIED = "Wed, 01 Jan 2020 00:00:00 GMT"
+
+
+def _age(document_id: int) -> None:
+    with Session(engine) as session:
+        session.execute(
+            update(models.Document).where(models.Document.id == document_id).values(updated_at=datetime(2020, 1, 1))
+        )
+        session.commit()
+
+
+def test_document_details_revalidate_with_last_modified(client, make_user, upload, share):
+    owner, reader = make_user("owner"), make_user("reader")
+    document = upload(owner)
+    _age(document["id"])
+    url = f"/documents/getDocument/{document['id']}/"
+
+    response = client.get(url, headers=owner.headers)
+    assert response.status_code == 200
+    assert response.headers["last-modified"] == LAST_MODIFIED
+
+    response = client.get(url, headers={**owner.headers, "If-Modified-Since": LAST_MODIFIED})
+    assert response.status_code == 304
+
+    # Sharing changes the permissions in the details, and so their modification time.
+    share(owner, document["id"], reader)
+    response = client.get(url, headers={**owner.headers, "If-Modified-Since": LAST_MODIFIED})
+    assert response.status_code == 200
+    assert len(response.json()["permissions"]) == 2
+
+
+def test_document_list_sends_last_modified_but_revalidates_by_etag(client, make_user, upload):
+    owner = make_user("owner")
+    document = upload(owner)
+    _age(document["id"])
+
+    response = client.get("/documents/getDocuments/", headers=owner.headers)
+    assert response.status_code == 200
+    assert response.headers["last-modified"] == LAST_MODIFIED
+
+    response = client.get("/documents/getDocuments/", headers={**owner.headers, "If-Modified-Since": LAST_MODIFIED})
+    assert response.status_code == 200
+
+    etag = response.headers["etag"]
+    response = client.get("/documents/getDocuments/", headers={**owner.headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["last-modified"] == LAST_MODIFIED
+
+
+def test_preview_revalidates_with_last_modified(client, make_user, upload, tmp_path):
+    owner = make_user("owner")
+    document = upload(owner)
+    preview = tmp_path / "preview.png"
+    preview.write_bytes(b"\x89PNG preview")
+    storage.backend.put(storage.preview_key(document["filename"]), preview)
+    with Session(engine) as session:
+        session.execute(update(models.Document).where(models.Document.id == document["id"]).values(has_preview=True))
+        session.commit()
+    _age(document["id"])
+    url = f"/documents/getPreview/{document['id']}/"
+
+    response = client.get(url, headers=owner.headers)
+    assert response.status_code == 200
+    assert response.headers["last-modified"] == LAST_MODIFIED
+    assert response.content == b"\x89PNG preview"
+
+    response = client.get(url, headers={**owner.headers, "If-Modified-Since": LAST_MODIFIED})
+    assert response.status_code == 304
+    assert response.headers["last-modified"] == LAST_MODIFIED
+
+    response = client.get(url, headers={**owner.headers, "If-Modified-Since": "Tue, 31 Dec 2019 00:00:00 GMT"})
+    assert response.status_code == 200
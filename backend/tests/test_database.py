@@ -0,0 +1,58 @@
+from sqlalchemy import text
+from sqlmodel import create_engine
+from app import database
+from app.config import settings
+
+
+def _pragmas(engine) -> dict:
+    with engine.connect() as connection:
+        return {
+            name: connection.execute(text(f"PRAGMA {name}")).scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size", "mmap_size")
+        }
+
+
+def test_sqlite_connections_get_the_tuning_profile():
+    assert _pragmas(database.engine) == {
+        "journal_mode": settings.SQLITE_JOURNAL_MODE.lower(),
+        "synchronous": 1,
+        "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -settings.SQLITE_CACHE_SIZE_KB,
+        "mmap_size": settings.SQLITE_MMAP_SIZE,
+    }
+
+
+def test_writers_commit_while_readers_hold_a_snapshot(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wal.db'}", connect_args={"check_same_thread": False})
+    database.tune_connections(engine)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE item (id INTEGER PRIMARY KEY)"))
+        connection.execute(text("INSERT INTO item VALUES (1)"))
+
+    with engine.connect() as reader, engine.connect() as writer:
+        reader.execute(text("BEGIN"))
+        assert reader.execute(text("SELECT count(*) FROM item")).scalar() == 1
+        # Under the default rollback journal this commit would fail with "database is locked".
+        writer.execute(text("INSERT INTO item VALUES (2)"))
+        writer.commit()
+        assert reader.execute(text("SELECT count(*) FROM item")).scalar() == 1
+        reader.execute(text("COMMIT"))
+        assert reader.execute(text("SELECT count(*) FROM item")).scalar() == 2
+    engine.dispose()
+
+
+def test_postgres_profile(monkeypatch):
+    url = "postgresql://user:secret@db/app"
+    assert database._engine_options(url) == {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    assert database._tuning_statements("postgresql") == [
+        f"SET statement_timeout = {settings.DB_STATEMENT_TIMEOUT_MS}"
+    ]
+
+    monkeypatch.setattr(settings, "DB_TUNING", False)
+    assert database._engine_options(url) == {}
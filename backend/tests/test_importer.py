@@ -0,0 +1,79 @@
+import hashlib
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+from app import crud, importer, models
+from app.database import engine
+
+
+class Interrupted(Exception):
+    pass
+
+
+def _journal(sources) -> dict:
+    with Session(engine) as session:
+        rows = session.exec(select(models.ImportedFile).where(models.ImportedFile.source.in_(sources))).all()
+        return {row.source: row.document_id for row in rows}
+
+
+def _fail_next_commit():
+    def fail(session):
+        event.remove(OrmSession, "before_commit", fail)
+        raise RuntimeError("commit failed")
+    event.listen(OrmSession, "before_commit", fail)
+
+
+def test_interrupted_import_resumes_where_it_stopped(client, make_user, tmp_path):
+    owner = make_user("owner")
+    contents = {f"file{i}.txt": f"archived file {i}".encode() for i in range(5)}
+    for name, content in contents.items():
+        (tmp_path / name).write_bytes(content)
+
+    def run(report):
+        files = importer.scan_directory(tmp_path, owner.email)
+        return importer.run_import(files, workers=2, batch_size=2, report=report)
+
+    def stop(summary):
+        raise Interrupted(summary)
+
+    # Stopped after the first batch committed.
+    with pytest.raises(Interrupted):
+        run(stop)
+    sources = [str((tmp_path / name).resolve()) for name in contents]
+    assert _journal(sources).keys() == set(sources[:2])
+
+    # The second batch fails to commit, leaving nothing of it behind.
+    _fail_next_commit()
+    with pytest.raises(RuntimeError):
+        run(lambda summary: None)
+    assert _journal(sources).keys() == set(sources[:2])
+
+    stats = run(lambda summary: None)
+    assert (stats.skipped, stats.imported, stats.failed) == (2, 3, 0)
+    journal = _journal(sources)
+    assert journal.keys() == set(sources)
+    for name, source in zip(contents, sources):
+        response = client.get(f"/documents/downloadDocument/{journal[source]}/", headers=owner.headers)
+        assert response.status_code == 200
+        assert hashlib.sha256(response.content).hexdigest() == hashlib.sha256(contents[name]).hexdigest()
+
+    assert run(lambda summary: None).skipped == len(contents)
+
+
+def test_sources_already_imported_are_not_imported_again(client, make_user, tmp_path):
+    owner = make_user("owner")
+    path = tmp_path / "once.txt"
+    path.write_bytes(b"imported once")
+    importer.run_import(importer.scan_directory(tmp_path, owner.email), report=lambda summary: None)
+    source = str(path.resolve())
+    document_id = _journal([source])[source]
+
+    # A second import racing the first finds the source journaled when it comes to insert.
+    with Session(engine) as session:
+        document = session.get(models.Document, document_id)
+        entry = models.DocumentCreate(**document.model_dump(include=set(models.DocumentCreate.model_fields)))
+        assert crud.import_documents(session, [(source, owner.id, entry)], created_keys=[]) == []
+    assert _journal([source]) == {source: document_id}
+    response = client.get("/documents/getDocuments/", params={"owner_id": owner.id}, headers=owner.headers)
+    assert [document["id"] for document in response.json()["documents"]] == [document_id]
@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+import asyncio
+import json
+import threading
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from app import acl, dependencies
+from app.invalidation import RedisInvalidationChannel
+
+
+class RecordingRedis:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel: str, data: str) -> None:
+        self.published.append((threading.get_ident(), json.loads(data)))
+
+
+def test_async_crud_publishes_off_the_event_loop(monkeypatch):
+    remote = RedisInvalidationChannel(client=RecordingRedis())
+    remote.subscribe(acl._apply)
+    monkeypatch.setattr(acl, "channel", remote)
+    monkeypatch.setattr(dependencies, "channel", remote)
+    acl.store(42, 7, acl.Access(is_owner=False, can_view=True, can_sign=False), acl._generation)
+    request = SimpleNamespace(state=SimpleNamespace(principal=SimpleNamespace(id=7)))
+
+    def revoke(session):
+        session.info["committed"] = True
+        acl.invalidate(42, 7)
+        # This worker's cache is invalidated right away; only the Redis round trip waits.
+        assert acl.lookup(42, 7) is acl.MISSING
+        assert remote.client.published == []
+
+    async def main():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with AsyncSession(engine) as session:
+                await dependencies.DB(session, request).run(revoke)
+        finally:
+            await engine.dispose()
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert [message for _, message in remote.client.published] == [
+        {"type": "acl", "document_id": 42, "user_id": 7},
+        {"type": "write", "user_id": 7},
+    ]
+    assert all(thread != loop_thread for thread, _ in remote.client.published)
@@ -0,0 +1,14 @@
+import re
+
+
+def _series_count(text: str, name: str, labels: str) -> int:
+    match = re.search(rf"^{name}_count\{{{re.escape(labels)}\}} (\d+)$", text, re.MULTILINE)
+    return int(match.group(1)) if match else 0
+
+
+def test_pool_checkout_waits_are_recorded(client, make_user):
+    user = make_user()
+    before = _series_count(client.get("/metrics").text, "db_pool_checkout_wait_seconds", 'engine="sync"')
+    assert client.get("/documents/getDocuments/", headers=user.headers).status_code == 200
+    after = _series_count(client.get("/metrics").text, "db_pool_checkout_wait_seconds", 'engine="sync"')
+    assert after > before
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from sqlmodel import Session
+from app import models
+from app.database import engine
+
+BASE = datetime(2024, 1, 1)
+
+
+def _set_upload_date(document_id: int, upload_date: datetime) -> None:
+    with Session(engine) as session:
+        session.execute(
+            update(models.Document).where(models.Document.id == document_id).values(upload_date=upload_date)
+        )
+        session.commit()
+
+
+def _list(client, user, **params) -> dict:
+    response = client.get("/documents/getDocuments/", params=params, headers=user.headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_pages_follow_on_without_duplicates_or_gaps(client, make_user, upload):
+    owner = make_user("owner")
+    ids = [upload(owner, content=f"page {i}".encode())["id"] for i in range(7)]
+    # Pairs of documents share an upload date, so pages must break ties on the id.
+    for i, document_id in enumerate(ids):
+        _set_upload_date(document_id, BASE + timedelta(days=i // 2))
+    expected = sorted(ids, key=lambda document_id: (ids.index(document_id) // 2, document_id), reverse=True)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = _list(client, owner, limit=3, **({"cursor": cursor} if cursor else {}))
+        seen += [document["id"] for document in page["documents"]]
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+    assert pages == 3
+
+
+def test_filters(client, make_user, upload, share):
+    owner, reader = make_user("owner"), make_user("reader")
+    own = upload(reader, content=b"reader's own", filename="own.txt", content_type="text/plain")
+    shared = upload(owner, content=b"shared pdf", filename="shared.pdf", content_type="application/pdf")
+    upload(owner, content=b"not shared")
+    share(owner, shared["id"], reader)
+    _set_upload_date(own["id"], BASE)
+    _set_upload_date(shared["id"], BASE + timedelta(days=10))
+
+    def ids(**params):
+        return [document["id"] for document in _list(client, reader, **params)["documents"]]
+
+    assert ids() == [shared["id"], own["id"]]
+    assert ids(shared_with_me=True) == [shared["id"]]
+    assert ids(owner_id=reader.id) == [own["id"]]
+    assert ids(content_type="application/pdf") == [shared["id"]]
+    assert ids(uploaded_after=(BASE + timedelta(days=5)).isoformat()) == [shared["id"]]
+    assert ids(uploaded_before=(BASE + timedelta(days=5)).isoformat()) == [own["id"]]
+
+
+def test_limit_is_capped_and_cursors_are_checked(client, make_user):
+    user = make_user()
+    url = "/documents/getDocuments/"
+    assert client.get(url, params={"limit": 1000}, headers=user.headers).status_code == 200
+    assert client.get(url, params={"limit": 1001}, headers=user.headers).status_code == 400
+    assert client.get(url, params={"limit": 0}, headers=user.headers).status_code == 400
+    assert client.get(url, params={"cursor": "not a cursor"}, headers=user.headers).status_code == 400
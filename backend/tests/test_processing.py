@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import threading
+import anyio
+from app import processing
+
+
+def test_waiting_on_the_pool_holds_no_threadpool_thread(make_user, upload, monkeypatch):
+    owner = make_user("owner")
+    document = upload(owner)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_analyze(*args):
+        started.set()
+        release.wait(10)
+        return {"has_preview": False}
+
+    monkeypatch.setattr(processing.extraction, "analyze", slow_analyze)
+    job = {"id": 0, "document_id": document["id"], "blob_key": document["filename"], "encoding": None,
+           "original_filename": "a.txt"}
+
+    async def scenario():
+        runner = processing.JobRunner()
+        runner._pool = ThreadPoolExecutor(max_workers=1)
+        task = asyncio.create_task(runner._analyze(job))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        borrowed = anyio.to_thread.current_default_thread_limiter().borrowed_tokens
+        release.set()
+        result = await task
+        runner._pool.shutdown()
+        return borrowed, result
+
+    borrowed, result = asyncio.run(scenario())
+    assert borrowed == 0
+    assert result == {"has_preview": False}
@@ -0,0 +1,48 @@
+from sqlmodel import Session
+import pytest
+from app import crud, metrics, models, schemas
+from app.database import engine
+
+
+def _count_queries(call) -> int:
+    stats = metrics.RequestStats()
+    token = metrics.current_request.set(stats)
+    try:
+        call()
+    finally:
+        metrics.current_request.reset(token)
+    return stats.queries
+
+
+@pytest.mark.parametrize("shares", [1, 50])
+def test_document_details_load_in_three_queries(make_user, upload, shares):
+    owner = make_user("owner")
+    document = upload(owner)
+    with Session(engine) as session:
+        users = [
+            crud.create_user(session, models.UserCreate(email=f"signer{i}-{document['id']}@test.local", password="-"), "-")
+            for i in range(shares)
+        ]
+        crud.grant_permissions_bulk(session, document["id"], owner.id, [
+            schemas.ShareDocumentRequest(email=user.email, can_view=True, can_sign=True) for user in users
+        ])
+        for user in users:
+            crud.create_signature(session, document["id"], user.id, models.SignatureCreate(comments="ok"))
+
+    with Session(engine) as session:
+        result = {}
+        queries = _count_queries(lambda: result.setdefault(
+            "doc", crud.get_document_with_details(session, document["id"], owner.id)))
+        doc = result["doc"]
+        # Touching the loaded relationships must not issue more statements.
+        touched = _count_queries(lambda: (
+            doc.owner.email,
+            [permission.user_obj.email for permission in doc.permissions],
+            [signature.signer.email for signature in doc.signatures],
+        ))
+
+    assert queries == 3
+    assert touched == 0
+    # The owner's own permission plus one per share.
+    assert len(doc.permissions) == shares + 1
+    assert len(doc.signatures) == shares
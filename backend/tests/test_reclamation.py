@@ -0,0 +1,121 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+from app import crud, models, reclamation, storage
+from app.database import engine
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Keys handed to the reclaimer, which is kept from running so tests can run it when they choose."""
+    keys = []
+    monkeypatch.setattr(reclamation.reclaimer, "submit", keys.extend)
+    return keys
+
+
+def _delete(client, user, document_id: int) -> None:
+    assert client.delete(f"/documents/deleteDocument/{document_id}/", headers=user.headers).status_code == 204
+
+
+def test_upload_racing_the_reclaimer_keeps_its_file(client, make_user, upload, queued, monkeypatch):
+    owner = make_user("owner")
+    content = b"deleted, then uploaded again"
+    first = upload(owner, content=content)
+    _delete(client, owner, first["id"])
+    assert queued == [first["filename"]]
+
+    create_document = crud.create_document
+
+    def reclaim_then_create(session, **kwargs):
+        # The upload found the file still stored; the reclaimer runs before its reference commits.
+        reclamation.reclaimer._reclaim(queued)
+        return create_document(session, **kwargs)
+
+    monkeypatch.setattr(crud, "create_document", reclaim_then_create)
+    second = upload(owner, content=content)
+    assert second["filename"] == first["filename"]
+    assert storage.backend.exists(second["filename"])
+    response = client.get(f"/documents/downloadDocument/{second['id']}/", headers=owner.headers)
+    assert response.content == content
+
+
+def test_reference_committed_before_the_reclaimer_runs_keeps_the_file(client, make_user, upload, queued):
+    owner = make_user("owner")
+    content = b"uploaded again before the reclaimer ran"
+    first = upload(owner, content=content)
+    _delete(client, owner, first["id"])
+    second = upload(owner, content=content)
+
+    reclamation.reclaimer._reclaim(queued)
+    assert storage.backend.exists(second["filename"])
+
+
+def _ref_count(key: str):
+    with Session(engine) as session:
+        blob = session.get(models.Blob, key)
+        return None if blob is None else blob.ref_count
+
+
+def test_failed_bulk_delete_keeps_the_files(client, make_user, upload):
+    owner = make_user("owner")
+    documents = [upload(owner, content=f"kept {i}".encode()) for i in range(2)]
+
+    def fail(session):
+        raise RuntimeError("commit failed")
+
+    event.listen(OrmSession, "before_commit", fail)
+    try:
+        with pytest.raises(RuntimeError):
+            client.post(
+                "/documents/deleteDocuments/", json={"document_ids": [d["id"] for d in documents]},
+                headers=owner.headers,
+            )
+    finally:
+        event.remove(OrmSession, "before_commit", fail)
+
+    reclamation.reclaimer.join()
+    for i, document in enumerate(documents):
+        assert storage.backend.exists(document["filename"])
+        assert _ref_count(document["filename"]) == 1
+        response = client.get(f"/documents/downloadDocument/{document['id']}/", headers=owner.headers)
+        assert response.content == f"kept {i}".encode()
+
+
+def test_bulk_delete_removes_only_unreferenced_files(client, make_user, upload):
+    owner = make_user("owner")
+    shared_a, shared_b = upload(owner, content=b"in two documents"), upload(owner, content=b"in two documents")
+    single = upload(owner, content=b"in one document")
+
+    response = client.post(
+        "/documents/deleteDocuments/", json={"document_ids": [shared_a["id"], single["id"]]}, headers=owner.headers
+    )
+    assert sorted(response.json()["deleted"]) == sorted([shared_a["id"], single["id"]])
+
+    reclamation.reclaimer.join()
+    assert storage.backend.exists(shared_b["filename"])
+    assert _ref_count(shared_b["filename"]) == 1
+    assert not storage.backend.exists(single["filename"])
+    assert _ref_count(single["filename"]) is None
+
+
+def test_identical_uploads_share_one_counted_blob(client, make_user, upload):
+    owner = make_user("owner")
+    first, second = upload(owner, content=b"stored once"), upload(owner, content=b"stored once")
+    key = first["filename"]
+    assert second["filename"] == key
+    with Session(engine) as session:
+        assert len(session.exec(select(models.Blob).where(models.Blob.sha256 == key)).all()) == 1
+    assert _ref_count(key) == 2
+
+    _delete(client, owner, first["id"])
+    reclamation.reclaimer.join()
+    assert _ref_count(key) == 1
+    assert storage.backend.exists(key)
+    response = client.get(f"/documents/downloadDocument/{second['id']}/", headers=owner.headers)
+    assert response.content == b"stored once"
+
+    _delete(client, owner, second["id"])
+    reclamation.reclaimer.join()
+    assert _ref_count(key) is None
+    assert not storage.backend.exists(key)
@@ -0,0 +1,39 @@
+from pathlib import Path
+import sqlite3
+from sqlalchemy import create_engine
+from app import acl, dependencies
+from app.config import settings
+
+
+def _copy_primary(target: Path) -> None:
+    """Bring the replica up to the primary's current state."""
+    source = sqlite3.connect(settings.DATABASE_URL.removeprefix("sqlite:///"))
+    destination = sqlite3.connect(target)
+    try:
+        source.backup(destination)
+    finally:
+        source.close()
+        destination.close()
+
+
+def test_revoked_access_is_not_recached_from_a_lagging_replica(client, make_user, upload, share, tmp_path,
+                                                             monkeypatch):
+    owner, reader = make_user("owner"), make_user("reader")
+    document = upload(owner)
+    share(owner, document["id"], reader)
+
+    replica_path = tmp_path / "replica.db"
+    _copy_primary(replica_path)
+    replica = create_engine(f"sqlite:///{replica_path}", connect_args={"check_same_thread": False})
+    monkeypatch.setattr(dependencies, "replica_engines", [replica])
+
+    # The replica has not seen the revoke yet, so this read still succeeds.
+    share(owner, document["id"], reader, can_view=False)
+    download = f"/documents/downloadDocument/{document['id']}/"
+    assert client.get(download, headers=reader.headers).status_code == 200
+    assert acl.lookup(document["id"], reader.id) is acl.MISSING
+
+    _copy_primary(replica_path)
+    assert client.get(download, headers=reader.headers).status_code == 404
+    assert client.get(f"/documents/getDocument/{document['id']}/", headers=reader.headers).status_code == 404
+    replica.dispose()
@@ -0,0 +1,48 @@
+import pytest
+from app.storage import S3Storage
+
+boto3 = pytest.importorskip("boto3")
+mock_aws = pytest.importorskip("moto").mock_aws
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    for name, value in {"AWS_ACCESS_KEY_ID": "test", "AWS_SECRET_ACCESS_KEY": "test",
+                        "AWS_DEFAULT_REGION": "us-east-1"}.items():
+        monkeypatch.setenv(name, value)
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="documents")
+        yield S3Storage("documents", prefix="blobs/", client=client)
+
+
+def test_put_deduplicates_and_leaves_the_second_source(s3, tmp_path):
+    first, second = tmp_path / "first", tmp_path / "second"
+    first.write_bytes(b"0123456789")
+    second.write_bytes(b"0123456789")
+
+    assert s3.put("key", first) is True
+    assert not first.exists()
+    assert s3.put("key", second) is False
+    assert second.exists()
+    assert list(s3.keys()) == ["key"]
+    assert s3.client.head_object(Bucket="documents", Key="blobs/key")["ContentLength"] == 10
+
+
+def test_open_size_range_and_delete(s3, tmp_path):
+    source = tmp_path / "source"
+    source.write_bytes(b"0123456789")
+    s3.put("key", source)
+
+    assert s3.exists("key") and not s3.exists("other")
+    assert s3.size("key") == 10
+    with s3.open("key") as stream:
+        assert stream.read() == b"0123456789"
+    assert b"".join(s3.iter_range("key", 2, 5)) == b"2345"
+    assert b"".join(s3.iter_range("key", 0, 9, chunk_size=3)) == b"0123456789"
+    with s3.materialize("key") as path:
+        assert path.read_bytes() == b"0123456789"
+
+    s3.delete("key")
+    assert not s3.exists("key")
+    assert list(s3.keys()) == []
@@ -0,0 +1,15 @@
+def _search(client, user, query: str) -> list:
+    response = client.get("/documents/search/", params={"q": query}, headers=user.headers)
+    assert response.status_code == 200, response.text
+    return [document["id"] for document in response.json()["documents"]]
+
+
+def test_deleted_documents_leave_the_index(client, make_user, upload):
+    owner = make_user("owner")
+    kept = upload(owner, filename="zanzibar-kept.txt")
+    deleted = upload(owner, content=b"other", filename="zanzibar-deleted.txt")
+    assert sorted(_search(client, owner, "zanzibar")) == sorted([kept["id"], deleted["id"]])
+
+    response = client.delete(f"/documents/deleteDocument/{deleted['id']}/", headers=owner.headers)
+    assert response.status_code == 204
+    assert _search(client, owner, "zanzibar") == [kept["id"]]
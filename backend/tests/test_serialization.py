@@ -0,0 +1,54 @@
+import json
+from sqlmodel import Session, select
+from app import models, serialization
+from app.database import engine
+
+
+def test_permissions_carry_their_user(client, make_user, upload, share):
+    owner, reader, other = make_user("owner"), make_user("reader"), make_user("other")
+    document = upload(owner)
+
+    response = client.post(
+        f"/documents/addUser/{document['id']}/", json={"email": reader.email, "can_view": True}, headers=owner.headers
+    )
+    assert response.json()["user"]["email"] == reader.email
+
+    response = client.post(
+        f"/documents/addUsers/{document['id']}/", json={"shares": [{"email": other.email, "can_view": True}]},
+        headers=owner.headers,
+    )
+    assert response.json()["results"][0]["permission"]["user"]["email"] == other.email
+
+    details = client.get(f"/documents/getDocument/{document['id']}/", headers=owner.headers).json()
+    assert {permission["user_id"]: permission["user"]["email"] for permission in details["permissions"]} == {
+        owner.id: owner.email, reader.id: reader.email, other.id: other.email
+    }
+
+
+def test_an_unloaded_user_is_not_lazy_loaded(make_user, upload):
+    owner = make_user("owner")
+    document = upload(owner)
+    with Session(engine, expire_on_commit=False) as session:
+        permission = session.exec(
+            select(models.DocumentPermission).where(models.DocumentPermission.document_id == document["id"])
+        ).one()
+
+    # Detached, so reading user_obj here would raise.
+    body = json.loads(serialization.PERMISSION.render(permission))
+    assert body["user_id"] == owner.id
+    assert body["user"] is None
+
+
+def test_bulk_delete_goes_through_the_serializer(client, make_user, upload, monkeypatch):
+    owner, other = make_user("owner"), make_user("other")
+    own, foreign = upload(owner, content=b"own"), upload(other, content=b"foreign")
+    rendered, render = [], serialization.BULK_DELETE.render
+    monkeypatch.setattr(serialization.BULK_DELETE, "render", lambda source: rendered.append(source) or render(source))
+
+    response = client.post(
+        "/documents/deleteDocuments/", json={"document_ids": [own["id"], foreign["id"], own["id"], 0]},
+        headers=owner.headers,
+    )
+    assert response.status_code == 200
+    assert response.json() == {"deleted": [own["id"]], "not_deleted": [foreign["id"], 0]}
+    assert rendered == [response.json()]
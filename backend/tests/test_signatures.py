@@ -0,0 +1,12 @@
+def test_signing_twice_is_rejected(client, make_user, upload):
+    owner = make_user("owner")
+    document = upload(owner)
+    url = f"/documents/signDocument/{document['id']}/"
+
+    assert client.post(url, json={"comments": "first"}, headers=owner.headers).status_code == 200
+    response = client.post(url, json={"comments": "again"}, headers=owner.headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Document already signed by this user."
+
+    details = client.get(f"/documents/getDocument/{document['id']}/", headers=owner.headers).json()
+    assert [signature["comments"] for signature in details["signatures"]] == ["first"]
@@ -0,0 +1,62 @@
+import asyncio
+import hashlib
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from app import crud, dependencies, reclamation, storage
+from app.config import settings
+from app.database import to_async_url
+
+
+@pytest.fixture
+def async_db(monkeypatch):
+    monkeypatch.setattr(settings, "DB_ASYNC", True)
+    monkeypatch.setattr(
+        dependencies, "async_engine", create_async_engine(to_async_url(settings.DATABASE_URL), poolclass=NullPool)
+    )
+
+
+@pytest.fixture
+def store_calls(monkeypatch):
+    calls = []
+    store_blob = storage.store_blob
+
+    def recording_store_blob(upload):
+        try:
+            asyncio.get_running_loop()
+            calls.append("event loop")
+        except RuntimeError:
+            calls.append("thread")
+        return store_blob(upload)
+
+    monkeypatch.setattr(storage, "store_blob", recording_store_blob)
+    return calls
+
+
+def test_files_are_stored_off_the_event_loop(async_db, store_calls, client, make_user, upload):
+    owner = make_user("owner")
+    document = upload(owner, content=b"stored off the loop")
+    response = client.put(
+        f"/documents/replaceDocument/{document['id']}/", headers=owner.headers,
+        files={"file": ("b.txt", b"replaced off the loop", "text/plain")},
+    )
+    assert response.status_code == 200, response.text
+    assert store_calls == ["thread", "thread"]
+
+
+def test_a_failed_insert_reclaims_the_new_file(store_calls, client, make_user, monkeypatch):
+    owner = make_user("owner")
+
+    def failing_create_document(session, **kwargs):
+        raise RuntimeError("insert failed")
+
+    monkeypatch.setattr(crud, "create_document", failing_create_document)
+    content = b"never referenced"
+    with pytest.raises(RuntimeError):
+        client.post(
+            "/documents/addDocument/", data={"title": "a"}, files={"file": ("a.txt", content, "text/plain")},
+            headers=owner.headers,
+        )
+    assert store_calls == ["thread"]
+    reclamation.reclaimer.join()
+    assert not storage.backend.exists(hashlib.sha256(content).hexdigest())
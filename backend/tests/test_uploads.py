@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+from app import storage
+from app.config import Settings, settings
+from app.middleware import MaxBodySizeMiddleware
+
+
+def test_staging_dir_follows_upload_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path / "uploads"))
+    assert Settings().STAGING_DIR == tmp_path / "uploads" / ".staging"
+
+    monkeypatch.setenv("STAGING_DIR", str(tmp_path / "staging"))
+    assert Settings().STAGING_DIR == tmp_path / "staging"
+
+
+def _staged_files() -> set:
+    return set(settings.STAGING_DIR.glob("*.part"))
+
+
+def test_upload_over_the_size_limit_is_rejected_and_cleaned_up(client, make_user, monkeypatch):
+    owner = make_user("owner")
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 10)
+    before = _staged_files()
+    response = client.post(
+        "/documents/addDocument/", data={"title": "big"}, files={"file": ("big.txt", b"x" * 11, "text/plain")},
+        headers=owner.headers,
+    )
+    assert response.status_code == 413
+    assert _staged_files() == before
+
+
+def test_request_body_over_the_limit_is_rejected_by_the_middleware():
+    async def echo(request):
+        return Response(await request.body())
+
+    app = MaxBodySizeMiddleware(Starlette(routes=[Route("/", echo, methods=["POST"])]), max_size=10)
+    client = TestClient(app)
+    assert client.post("/", content=b"x" * 10).content == b"x" * 10
+    assert client.post("/", content=b"x" * 11).status_code == 413
+
+
+class _AbortedUpload:
+    """An UploadFile whose client goes away after the first chunk."""
+    size = None
+    content_type = "text/plain"
+
+    def __init__(self):
+        self.reads = 0
+
+    async def read(self, size: int) -> bytes:
+        self.reads += 1
+        if self.reads > 1:
+            raise ConnectionResetError("client disconnected")
+        return b"first chunk"
+
+    async def close(self) -> None:
+        pass
+
+
+def test_aborted_upload_leaves_no_staged_file(tmp_path):
+    with pytest.raises(ConnectionResetError):
+        asyncio.run(storage.stage_upload(_AbortedUpload(), directory=tmp_path))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_upload_growing_past_the_limit_leaves_no_staged_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 5)
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(storage.stage_upload(_AbortedUpload(), directory=tmp_path))
+    assert raised.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []
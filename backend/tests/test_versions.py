@@ -0,0 +1,37 @@
+from sqlmodel import Session
+from app import crud
+from app.database import engine
+
+
+def _replace(client, user, document_id: int, **kwargs):
+    response = client.put(f"/documents/replaceDocument/{document_id}/", headers=user.headers, **kwargs)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_metadata_update_after_a_replace_keeps_the_new_file(client, make_user, upload, monkeypatch):
+    owner = make_user("owner")
+    document = upload(owner, content=b"first")
+    with Session(engine, expire_on_commit=False) as session:
+        before_replace = crud.get_document(session, document["id"], owner.id)
+
+    replaced = _replace(client, owner, document["id"], files={"file": ("b.txt", b"second", "text/plain")})
+    assert replaced["version"] == 2
+
+    # The metadata update reads the document as it was before the replace committed.
+    monkeypatch.setattr(crud, "get_document", lambda session, document_id, user_id: before_replace)
+    updated = _replace(client, owner, document["id"], data={"title": "renamed"})
+    monkeypatch.undo()
+
+    assert updated["title"] == "renamed"
+    assert updated["version"] == 2
+    assert (updated["filename"], updated["original_filename"], updated["size"]) == (
+        replaced["filename"], "b.txt", len(b"second")
+    )
+
+    versions = client.get(f"/documents/getVersions/{document['id']}/", headers=owner.headers).json()
+    assert [(version["version"], version["filename"]) for version in versions] == [
+        (2, replaced["filename"]), (1, document["filename"])
+    ]
+    response = client.get(f"/documents/downloadDocument/{document['id']}/", headers=owner.headers)
+    assert response.content == b"second"
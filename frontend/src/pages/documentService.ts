@@ -20,18 +20,27 @@ export interface FileUser {
     can_sign: boolean;
 }
 
+// The list comes in pages; follow next_cursor until the last one so no document is left out.
 export async function getFiles(token: string): Promise<Document[]> {
     try {
-        const response = await fetch("http://localhost:8000/documents/getDocuments", {
-            method: "GET",
-            headers: {
-                "Authorization": `Bearer ${token}`,
-            },
-        });
-
-        if (!response.ok) return [];
-        const data = await response.json();
-        return Array.isArray(data.documents) ? data.documents : [];
+        const files: Document[] = [];
+        let cursor: string | null = null;
+        do {
+            const params = new URLSearchParams({ limit: "1000" });
+            if (cursor) params.set("cursor", cursor);
+            const response = await fetch(`http://localhost:8000/documents/getDocuments/?${params}`, {
+                method: "GET",
+                headers: {
+                    "Authorization": `Bearer ${token}`,
+                },
+            });
+
+            if (!response.ok) return [];
+            const data = await response.json();
+            if (Array.isArray(data.documents)) files.push(...data.documents);
+            cursor = typeof data.next_cursor === "string" ? data.next_cursor : null;
+        } while (cursor);
+        return files;
     } catch (err) {
         console.error('Error fetching documents:', err);
         return [];